@@ -1,8 +1,14 @@
+import os
+import click
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 
 from app.core.config import Config
-from app.extensions import db, migrate
+from app.extensions import db, get_openai_client
+from ultis import ai_summary
+from ultis.prompt_registry import prompts
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
 
 def create_app():
     app = Flask(__name__)
@@ -11,11 +17,26 @@ def create_app():
     # 1. Khởi tạo Extensions
     CORS(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Flask-Migrate (kéo theo alembic) chỉ cần cho lệnh `flask db ...`: gunicorn / worker không import
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        # render_as_batch: SQLite (dev / benchmark) cần batch mode để đổi constraint / xóa cột
+        Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+
+    # Nạp + kiểm tra prompt templates một lần (lỗi prompt => dừng ngay khi khởi động)
+    prompts.load_all()
+    # Các lời gọi tóm tắt trong ultis dùng chung client OpenAI (pool kết nối) của app
+    ai_summary.client_provider = get_openai_client
 
     from app.api import api_bp
     app.register_blueprint(api_bp)
 
+    # 2. Lệnh quản trị: flask schema ..., flask vectors ..., flask documents ...
+    from app.cli import documents_cli, schema_cli, vectors_cli
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(vectors_cli)
+    app.cli.add_command(documents_cli)
+
     # 3. Route để phục vụ file tĩnh (Xem tài liệu đã upload)
     @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
@@ -2,9 +2,8 @@ from flask import Blueprint
 from flask_restx import Api
 
 from app.api.case_ns import case_ns
-
-# # Import các namespace bạn đã định nghĩa
-# from app.api.chat_ns import chat_ns
+from app.api.chat_ns import api as chat_ns
+from app.api.system_ns import system_ns
 
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
@@ -18,4 +17,5 @@ api = Api(
 
 # Thêm các namespace vào instance Api
 api.add_namespace(case_ns, path='/cases')
-# api.add_namespace(chat_ns, path='/chat')
\ No newline at end of file
+api.add_namespace(system_ns, path='/system')
+api.add_namespace(chat_ns, path='/chat')
\ No newline at end of file
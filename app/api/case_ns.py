@@ -35,18 +35,43 @@ upload_parser = case_ns.parser()
 upload_parser.add_argument('title', type=str, required=True, help='Tiêu đề vụ án', location='form')
 upload_parser.add_argument('files', type=FileStorage, location='files', required=True, action='append', help='Danh sách file hồ sơ')
 
+case_list_model = case_ns.model('CaseList', {
+    'id': fields.String(),
+    'title': fields.String(),
+    'status': fields.String(),
+    'created_at': fields.DateTime()
+})
+
+case_page_model = case_ns.model('CasePage', {
+    'items': fields.List(fields.Nested(case_list_model)),
+    'next_cursor': fields.String(description='Truyền vào ?cursor= để lấy trang tiếp theo, null nếu hết')
+})
+
+list_parser = case_ns.parser()
+list_parser.add_argument('limit', type=int, default=20, location='args', help='Số vụ án mỗi trang (tối đa 100)')
+list_parser.add_argument('cursor', type=str, location='args', help='next_cursor của trang trước')
+list_parser.add_argument('status', type=str, location='args', help='Lọc theo trạng thái, ví dụ COMPLETED')
+list_parser.add_argument('title', type=str, location='args', help='Lọc theo tiêu đề (chứa chuỗi, không phân biệt hoa thường)')
+
 @case_ns.route('')
 class CaseList(Resource):
     @case_ns.doc('list_cases')
-    @case_ns.marshal_list_with(case_ns.model('CaseList', {
-        'id': fields.String(),
-        'title': fields.String(),
-        'status': fields.String(),
-        'created_at': fields.DateTime()
-    }))
+    @case_ns.expect(list_parser)
+    @case_ns.marshal_with(case_page_model)
     def get(self):
-        """Lấy danh sách tất cả vụ án"""
-        return CaseService.get_all_cases()
+        """Lấy danh sách vụ án (mới nhất trước, phân trang theo cursor)"""
+        args = list_parser.parse_args()
+        limit = min(max(args.get('limit') or 20, 1), 100)
+        try:
+            items, next_cursor = CaseService.list_cases(
+                limit=limit,
+                cursor=args.get('cursor'),
+                status=args.get('status'),
+                title=args.get('title')
+            )
+        except ValueError as e:
+            case_ns.abort(400, str(e))
+        return {"items": items, "next_cursor": next_cursor}
 
     @case_ns.doc('create_case', responses={201: 'Created', 400: 'Validation Error'})
     @case_ns.expect(upload_parser, validate=True) # Thêm validate=True ở đây
@@ -90,4 +115,36 @@ class CaseDocuments(Resource):
         case = CaseService.get_case_by_id(case_id)
         if not case:
             case_ns.abort(404, "Không tìm thấy hồ sơ")
-        return case.documents, 200
\ No newline at end of file
+        return case.documents, 200
+
+page_model = case_ns.model('DocumentPage', {
+    'page': fields.Integer(example=1),
+    'content': fields.String(example='Nội dung OCR của trang')
+})
+
+document_pages_model = case_ns.model('DocumentPages', {
+    'document_id': fields.String(example='uuid-string'),
+    'total_pages': fields.Integer(example=120),
+    'start': fields.Integer(example=1),
+    'end': fields.Integer(example=20),
+    'pages': fields.List(fields.Nested(page_model))
+})
+
+pages_parser = case_ns.parser()
+pages_parser.add_argument('start', type=int, default=1, location='args', help='Trang bắt đầu (từ 1)')
+pages_parser.add_argument('end', type=int, location='args', help='Trang kết thúc (mặc định / tối đa: start + DOCUMENT_PAGES_MAX_RANGE - 1)')
+
+@case_ns.route('/<uuid:case_id>/documents/<uuid:document_id>/pages')
+@case_ns.param('case_id', 'ID định danh của vụ án')
+@case_ns.param('document_id', 'ID định danh của tài liệu')
+class DocumentPages(Resource):
+    @case_ns.doc('get_document_pages')
+    @case_ns.expect(pages_parser)
+    @case_ns.marshal_with(document_pages_model)
+    def get(self, case_id, document_id):
+        """Lấy nội dung OCR của tài liệu theo khoảng trang"""
+        args = pages_parser.parse_args()
+        result = CaseService.get_document_pages(case_id, document_id, args.get('start'), args.get('end'))
+        if result is None:
+            case_ns.abort(404, "Không tìm thấy tài liệu")
+        return result, 200
@@ -1,5 +1,5 @@
 from flask_restx import Namespace, Resource, fields
-from flask import request
+from flask import Response, request, stream_with_context
 from app.services.chat_service import ChatService
 
 api = Namespace('chat', description='RAG Chat Operations')
@@ -41,6 +41,23 @@ class ChatMessage(Resource):
         msg = ChatService.send_message(session_id, data['content'])
         return msg
 
+@api.route('/<string:session_id>/message/stream')
+class ChatMessageStream(Resource):
+    @api.expect(chat_input_model)
+    @api.produces(['text/event-stream'])
+    def post(self, session_id):
+        """Send a message and stream the answer as Server-Sent Events (citations, token..., done)"""
+        data = request.json
+        try:
+            events = ChatService.stream_message(session_id, data['content'])
+        except ValueError as e:
+            api.abort(404, str(e))
+        return Response(
+            stream_with_context(events),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'} # Tắt buffer của proxy (nginx)
+        )
+
 @api.route('/<string:session_id>/history')
 class ChatHistory(Resource):
     @api.marshal_list_with(message_model)
@@ -0,0 +1,20 @@
+from flask_restx import Namespace, Resource
+from app.extensions import embedding_cache, llm_cache
+from app.services.answer_cache import answer_cache_metrics
+from app.services.chat_service import stream_metrics
+from ultis.rate_limit import rate_limit_metrics
+
+system_ns = Namespace('system', description='Theo dõi vận hành (metrics của process hiện tại)')
+
+@system_ns.route('/metrics')
+class Metrics(Resource):
+    @system_ns.doc('get_metrics')
+    def get(self):
+        """Metrics: rate limiter (thời gian chờ, 429 / retry), hit rate của cache (embedding / câu trả lời chat / LLM tóm tắt), TTFB của chat streaming"""
+        return {
+            "rate_limits": rate_limit_metrics(),
+            "embedding_cache": embedding_cache.snapshot(),
+            "answer_cache": answer_cache_metrics.snapshot(),
+            "llm_cache": llm_cache.stats() if llm_cache else None,
+            "chat_stream": stream_metrics.snapshot()
+        }, 200
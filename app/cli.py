@@ -0,0 +1,63 @@
+import click
+from flask.cli import AppGroup
+
+schema_cli = AppGroup('schema', help='Quản lý schema database')
+vectors_cli = AppGroup('vectors', help='Quản lý dữ liệu vector (Qdrant)')
+documents_cli = AppGroup('documents', help='Quản lý dữ liệu tài liệu')
+
+@schema_cli.command('create')
+def create_schema():
+    """
+    Tạo schema cho database MỚI (db.create_all) rồi đánh dấu đã ở revision mới nhất.
+    Database đã có dữ liệu thì dùng `flask db upgrade` (create_all không thêm cột / constraint vào bảng có sẵn)
+    """
+    from flask_migrate import stamp
+    from sqlalchemy import inspect
+    from app import MIGRATIONS_DIR
+    from app.extensions import db
+    from app.models import case, chat, job  # noqa: F401 - đăng ký toàn bộ model vào metadata
+
+    existing = inspect(db.engine).get_table_names()
+    if existing:
+        raise click.ClickException(
+            f"Database đã có {len(existing)} bảng, không tạo lại. Cập nhật schema bằng: flask db upgrade"
+        )
+    db.create_all()
+    stamp(directory=MIGRATIONS_DIR, revision='head')
+    click.echo("✅ Database tables created successfully!")
+
+@vectors_cli.command('migrate')
+@click.option('--from', 'source_layout', type=click.Choice(['single', 'partitioned']), required=True)
+@click.option('--to', 'target_layout', type=click.Choice(['single', 'partitioned']), required=True)
+@click.option('--batch-size', default=256, show_default=True)
+@click.option('--keep-source', is_flag=True, help='Không xóa collection nguồn sau khi chuyển')
+def migrate_vectors(source_layout, target_layout, batch_size, keep_source):
+    """Chuyển point giữa các layout collection (single <-> partitioned)"""
+    from app.extensions import get_qdrant_client
+    qdrant_client = get_qdrant_client()
+    from app.services.indexing_service import migrate_layout
+
+    moved = migrate_layout(qdrant_client, source_layout, target_layout, batch_size, delete_source=not keep_source)
+    click.echo(f"✅ Đã chuyển {moved} point: {source_layout} -> {target_layout}")
+    click.echo(f"👉 Nhớ đặt QDRANT_LAYOUT={target_layout} cho API và worker")
+
+@vectors_cli.command('ensure-indexes')
+def ensure_indexes():
+    """Tạo collection + payload index (caseId, docId) cho layout hiện tại"""
+    from app.core.config import Config
+    from app.extensions import get_qdrant_client
+    qdrant_client = get_qdrant_client()
+    from app.services.indexing_service import ensure_collection, layout_collections
+
+    for name in layout_collections(Config.QDRANT_LAYOUT):
+        ensure_collection(qdrant_client, name)
+        click.echo(f"✅ {name}")
+
+@documents_cli.command('migrate-pages')
+@click.option('--batch-size', default=100, show_default=True, help='Số tài liệu mỗi transaction')
+def migrate_pages(batch_size):
+    """Chuyển nội dung OCR cũ (documents.raw_content) sang bảng document_pages"""
+    from app.services.document_page_service import DocumentPageService
+
+    migrated = DocumentPageService.migrate_legacy(batch_size)
+    click.echo(f"✅ Đã chuyển {migrated} tài liệu sang document_pages")
@@ -13,7 +13,96 @@ class Config:
     QDRANT_URL = os.getenv("QDRANT_URL")
     QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
     QDRANT_COLLECTION = "legal_knowledge"
-    
+    # "single": một collection + filter caseId, "partitioned": chia QDRANT_PARTITIONS collection theo hash(caseId)
+    # Đổi layout thì chạy: flask vectors migrate --from single --to partitioned
+    QDRANT_LAYOUT = os.getenv("QDRANT_LAYOUT", "single")
+    QDRANT_PARTITIONS = int(os.getenv("QDRANT_PARTITIONS", 16))
+    MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
+    # Client provider (app/extensions.py): timeout mỗi request (giây) + connection pool httpx của mỗi client
+    OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 60))
+    MISTRAL_TIMEOUT = float(os.getenv("MISTRAL_TIMEOUT", 180))  # OCR file lớn chậm
+    QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", 10))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 50))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+    # Chunking / indexing (app/services/indexing_service.py)
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))  # ký tự
+    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 256))  # text / lần gọi embeddings.create
+    QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", 256))
+    # Embedding cache (câu hỏi chat + chunk tài liệu): LRU trong process + SQLite dùng chung (để trống = tắt)
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+    EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 30 * 24 * 3600))  # giây
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(os.getcwd(), 'cache', 'embeddings.sqlite3'))
+    EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", 1000000))
+
+    # Chat retrieval (app/services/retrieval_service.py): BM25 + vector, gộp bằng RRF
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", 20))  # số ứng viên mỗi nhánh
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 4))  # số chunk đưa vào prompt
+    LEXICAL_INDEX_CACHE_CASES = int(os.getenv("LEXICAL_INDEX_CACHE_CASES", 32))
+    # Cross-encoder cục bộ (cần sentence-transformers), vd: BAAI/bge-reranker-v2-m3. Để trống = tắt
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 12))
+
+    # Prompt chat (app/services/context_builder.py): ngân sách token đếm bằng tiktoken
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 3000))  # ngữ cảnh tài liệu
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 1500))  # tóm tắt + các lượt gần nhất
+    # Bỏ chunk có tỉ lệ cụm từ chung với chunk đã chọn >= ngưỡng (chunk gối đầu / tài liệu trùng)
+    CHAT_CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CHAT_CONTEXT_DEDUP_THRESHOLD", 0.6))
+    # Cache câu trả lời theo vụ án (app/services/answer_cache.py): cosine embedding câu hỏi >= ngưỡng thì dùng lại
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+    ANSWER_CACHE_MAX_PER_CASE = int(os.getenv("ANSWER_CACHE_MAX_PER_CASE", 200))
+
     # Automation
     N8N_WEBHOOK_URL = os.getenv("N8N_WEBHOOK_URL")
-    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
\ No newline at end of file
+    UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # bytes / lần đọc
+    # GET /cases/<id>/documents/<id>/pages: số trang tối đa mỗi request
+    DOCUMENT_PAGES_MAX_RANGE = int(os.getenv("DOCUMENT_PAGES_MAX_RANGE", 50))
+
+    # Background processing (app/services/ingestion_pipeline.py)
+    # Số tài liệu của MỘT vụ án được OCR song song
+    OCR_CASE_CONCURRENCY = int(os.getenv("OCR_CASE_CONCURRENCY", 4))
+    # Trần số tài liệu OCR đồng thời trên toàn process (mọi vụ án cộng lại)
+    OCR_GLOBAL_CONCURRENCY = int(os.getenv("OCR_GLOBAL_CONCURRENCY", 8))
+    # Số worker của stage tóm tắt / index và kích thước hàng đợi giữa các stage
+    SUMMARIZE_CONCURRENCY = int(os.getenv("SUMMARIZE_CONCURRENCY", 4))
+    INDEX_CONCURRENCY = int(os.getenv("INDEX_CONCURRENCY", 2))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 8))
+    # Ghi kết quả tài liệu theo lô: mỗi PERSIST_BATCH_SIZE tài liệu hoặc PERSIST_FLUSH_INTERVAL giây một transaction
+    PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", 25))
+    PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", 2))
+    # Tóm tắt tài liệu dài: cửa sổ theo token (map song song) rồi gộp (reduce)
+    SUMMARY_WINDOW_TOKENS = int(os.getenv("SUMMARY_WINDOW_TOKENS", 6000))
+    SUMMARY_WINDOW_CONCURRENCY = int(os.getenv("SUMMARY_WINDOW_CONCURRENCY", 4))  # cửa sổ / tài liệu
+    # Cache kết quả LLM của các lời gọi tóm tắt (tài liệu, master summary): xử lý lại vụ án với đầu vào
+    # giống hệt không gọi lại model. Chỉ cache lời gọi temperature <= LLM_CACHE_MAX_TEMPERATURE.
+    # LLM_CACHE_BYPASS=true: luôn gọi model và ghi đè cache (làm mới kết quả)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(os.getcwd(), 'cache', 'llm'))
+    LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+    LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.2))
+    LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+    # Master summary: số tóm tắt tài liệu / bản tổng quan trong một prompt (cây map-reduce khi vụ án lớn hơn)
+    MASTER_SUMMARY_GROUP_SIZE = int(os.getenv("MASTER_SUMMARY_GROUP_SIZE", 20))
+
+    # OCR: "file" = stream file lên Mistral Files API, "base64" = nhúng data URI (tốn RAM)
+    OCR_UPLOAD_MODE = os.getenv("OCR_UPLOAD_MODE", "file")
+    # PDF lớn: chia lô theo trang và OCR song song (cần pypdf để đếm trang)
+    OCR_SPLIT_THRESHOLD_PAGES = int(os.getenv("OCR_SPLIT_THRESHOLD_PAGES", 50))
+    OCR_PAGE_BATCH_SIZE = int(os.getenv("OCR_PAGE_BATCH_SIZE", 25))
+    OCR_BATCH_CONCURRENCY = int(os.getenv("OCR_BATCH_CONCURRENCY", 4))
+
+    # OCR cache (theo hash nội dung file + model OCR)
+    OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(os.getcwd(), 'cache', 'ocr'))
+    OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+    # Job queue (bảng processing_jobs + worker.py)
+    JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", 3))
+    JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", 600))  # giây
+    JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", 10))
+    JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", 600))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
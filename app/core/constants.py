@@ -0,0 +1,10 @@
+# Trạng thái job trong bảng processing_jobs (xem docs/BACKEND_DESIGN.md - mục 2.9)
+JOB_STATUS_QUEUED = "QUEUED"
+JOB_STATUS_PROCESSING = "PROCESSING"
+JOB_STATUS_RETRYING = "RETRYING"
+JOB_STATUS_COMPLETED = "COMPLETED"
+JOB_STATUS_FAILED = "FAILED"
+
+# Loại job
+JOB_TYPE_CASE_INGESTION = "CASE_INGESTION"  # OCR + tóm tắt toàn bộ tài liệu + master summary của một vụ án
+JOB_TYPE_CHAT_COMPACTION = "CHAT_COMPACTION"  # Gộp các lượt chat cũ của một phiên vào history_summary
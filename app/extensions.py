@@ -1,13 +1,93 @@
+import threading
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from qdrant_client import QdrantClient
-from openai import OpenAI
 from app.core.config import Config
+from ultis.disk_cache import DiskCache
+from ultis.embedding_cache import EmbeddingCache
+from ultis.llm_cache import LLMCache
 
 
 db = SQLAlchemy()
-migrate = Migrate()
 
-# Lazy loading clients
-qdrant_client = QdrantClient(url=Config.QDRANT_URL, api_key=Config.QDRANT_API_KEY)
-openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
\ No newline at end of file
+# Client của các provider: tạo lười ở lần dùng đầu (import app / worker không mở kết nối),
+# mỗi client một connection pool httpx riêng (keep-alive), dùng chung giữa các thread.
+# Retry do ultis.rate_limit đảm nhiệm nên tắt retry nội bộ của SDK.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _lazy_client(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+def _http_limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY
+    )
+
+def _http_timeout(seconds):
+    import httpx
+    return httpx.Timeout(seconds, connect=Config.HTTP_CONNECT_TIMEOUT)
+
+def get_openai_client():
+    """OpenAI (sync) dùng chung cho API chat, embedding câu hỏi và các lời gọi tóm tắt"""
+    def create():
+        import httpx
+        from openai import OpenAI
+        timeout = _http_timeout(Config.OPENAI_TIMEOUT)
+        return OpenAI(
+            api_key=Config.OPENAI_API_KEY, max_retries=0, timeout=timeout,
+            http_client=httpx.Client(limits=_http_limits(), timeout=timeout)
+        )
+    return _lazy_client("openai", create)
+
+def create_async_openai_client():
+    """AsyncOpenAI mới (gắn với event loop đang chạy nên không dùng chung): caller tự close()"""
+    import httpx
+    from openai import AsyncOpenAI
+    timeout = _http_timeout(Config.OPENAI_TIMEOUT)
+    return AsyncOpenAI(
+        api_key=Config.OPENAI_API_KEY, max_retries=0, timeout=timeout,
+        http_client=httpx.AsyncClient(limits=_http_limits(), timeout=timeout)
+    )
+
+def get_qdrant_client():
+    def create():
+        from qdrant_client import QdrantClient
+        return QdrantClient(
+            url=Config.QDRANT_URL, api_key=Config.QDRANT_API_KEY,
+            timeout=Config.QDRANT_TIMEOUT, limits=_http_limits()
+        )
+    return _lazy_client("qdrant", create)
+
+def get_mistral_client():
+    """Mistral (OCR + Files API)"""
+    def create():
+        import httpx
+        from mistralai import Mistral
+        return Mistral(
+            api_key=Config.MISTRAL_API_KEY, timeout_ms=int(Config.MISTRAL_TIMEOUT * 1000),
+            client=httpx.Client(limits=_http_limits(), timeout=_http_timeout(Config.MISTRAL_TIMEOUT))
+        )
+    return _lazy_client("mistral", create)
+
+# SQLite của tầng cache dùng chung chỉ được mở (tạo thư mục / bảng) ở lần tra cứu đầu tiên
+embedding_cache = EmbeddingCache(
+    max_entries=Config.EMBEDDING_CACHE_SIZE,
+    ttl=Config.EMBEDDING_CACHE_TTL,
+    sqlite_path=Config.EMBEDDING_CACHE_PATH or None,
+    max_rows=Config.EMBEDDING_CACHE_MAX_ROWS
+)
+
+# Cache kết quả LLM cho tóm tắt tài liệu / master summary (None = tắt)
+llm_cache = LLMCache(
+    DiskCache(Config.LLM_CACHE_DIR, Config.LLM_CACHE_MAX_BYTES),
+    max_temperature=Config.LLM_CACHE_MAX_TEMPERATURE,
+    bypass=Config.LLM_CACHE_BYPASS
+) if Config.LLM_CACHE_ENABLED else None
\ No newline at end of file
@@ -10,6 +10,10 @@ class Case(db.Model):
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = db.Column(db.String(255), nullable=False)
     master_summary = db.Column(db.Text, nullable=True)
+    # Bản tổng quan còn mã [ref: ID] (đầu vào cho lần cập nhật tăng dần) và
+    # {document_id: sha256(summary)} của các tóm tắt tài liệu đã được gộp vào
+    master_summary_raw = db.Column(db.Text, nullable=True)
+    summary_sources = db.Column(JSON, nullable=True)
     status = db.Column(db.String(50), default="PENDING")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -18,6 +22,12 @@ class Case(db.Model):
     documents = db.relationship('Document', back_populates='case', cascade="all, delete-orphan")
     citations = db.relationship('Citation', back_populates='case', cascade="all, delete-orphan")
 
+    # Phục vụ GET /cases: phân trang keyset theo (created_at, id), có / không lọc theo status
+    __table_args__ = (
+        db.Index('idx_cases_created', 'created_at', 'id'),
+        db.Index('idx_cases_status_created', 'status', 'created_at', 'id'),
+    )
+
 class Document(db.Model):
     __tablename__ = 'documents'
 
@@ -25,14 +35,36 @@ class Document(db.Model):
     case_id = db.Column(UUID(as_uuid=True), db.ForeignKey('cases.id'), nullable=False)
     file_url = db.Column(db.String(500), nullable=False)
     file_name = db.Column(db.String(255), nullable=False)
+    # SHA-256 nội dung file (file_url trỏ tới bản lưu theo hash, dùng chung khi trùng nội dung)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    file_size = db.Column(db.BigInteger, nullable=True)
     label = db.Column(db.String(100), nullable=True)
     summary = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(50), default="PENDING")
-    # THÊM TRƯỜNG NÀY ĐỂ LƯU KẾT QUẢ OCR THEO TRANG
-    raw_content = db.Column(JSON, nullable=True)
+    # LEGACY: kết quả OCR theo trang trước khi có bảng document_pages.
+    # deferred để các truy vấn Document không kéo theo cột lớn này; chuyển dữ liệu cũ bằng:
+    #   flask documents migrate-pages
+    raw_content = db.deferred(db.Column(JSON, nullable=True))
     # BỔ SUNG: Khai báo để SQLAlchemy nhận diện được property 'citations' và 'case'
     case = db.relationship('Case', back_populates='documents')
     citations = db.relationship('Citation', back_populates='document', cascade="all, delete-orphan")
+    # Nội dung OCR theo trang (chỉ tải khi truy cập, dùng DocumentPageService để lấy theo khoảng trang)
+    pages = db.relationship('DocumentPage', back_populates='document', cascade="all, delete-orphan",
+                            order_by="DocumentPage.page_number")
+
+class DocumentPage(db.Model):
+    __tablename__ = 'document_pages'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    document_id = db.Column(UUID(as_uuid=True), db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False)
+    page_number = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text, nullable=False, default="")
+
+    document = db.relationship('Document', back_populates='pages')
+
+    __table_args__ = (
+        db.UniqueConstraint('document_id', 'page_number', name='uq_document_pages_page'),
+    )
 
 class Citation(db.Model):
     __tablename__ = 'citations'
@@ -46,4 +78,9 @@ class Citation(db.Model):
     citation_index = db.Column(db.Integer)
 
     case = db.relationship('Case', back_populates='citations')
-    document = db.relationship('Document', back_populates='citations')
\ No newline at end of file
+    document = db.relationship('Document', back_populates='citations')
+
+    # Mỗi tài liệu có một citation trong tổng quan vụ án (upsert theo cặp này)
+    __table_args__ = (
+        db.UniqueConstraint('case_id', 'document_id', name='uq_citations_case_document'),
+    )
\ No newline at end of file
@@ -10,6 +10,9 @@ class ChatSession(db.Model):
     case_id = db.Column(UUID(as_uuid=True), db.ForeignKey('cases.id'), nullable=False)
     title = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Rolling summary: các lượt cũ hơn summarized_until được gộp vào history_summary
+    history_summary = db.Column(db.Text, nullable=True)
+    summarized_until = db.Column(db.DateTime, nullable=True)
 
     messages = db.relationship('Message', backref='session', lazy=True, order_by="Message.timestamp")
 
@@ -21,4 +24,25 @@ class Message(db.Model):
     role = db.Column(db.String(20), nullable=False) # 'user' or 'bot'
     content = db.Column(db.Text, nullable=False)
     citations = db.Column(JSONB, nullable=True) # Array of {docId, fileName, content, page}
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class AnswerCacheEntry(db.Model):
+    """Câu trả lời đã sinh cho một câu hỏi trong vụ án, tra lại theo độ tương đồng embedding câu hỏi"""
+    __tablename__ = 'chat_answer_cache'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    case_id = db.Column(UUID(as_uuid=True), db.ForeignKey('cases.id'), nullable=False)
+    # Dấu vân tay master summary + tập tài liệu lúc sinh câu trả lời; khác hiện tại => entry hết hiệu lực
+    case_fingerprint = db.Column(db.String(64), nullable=False)
+    question = db.Column(db.Text, nullable=False)
+    embedding = db.Column(db.LargeBinary, nullable=False)  # float32 đã chuẩn hóa (array('f'))
+    answer = db.Column(db.Text, nullable=False)
+    citations = db.Column(JSONB, nullable=True)
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_answer_cache_case', 'case_id', 'case_fingerprint'),
+    )
@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.constants import JOB_STATUS_QUEUED
+from app.extensions import db
+
+class ProcessingJob(db.Model):
+    __tablename__ = 'processing_jobs'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_type = db.Column(db.String(50), nullable=False)
+
+    resource_id = db.Column(UUID(as_uuid=True), nullable=False)
+    resource_type = db.Column(db.String(50), nullable=False)
+
+    status = db.Column(db.String(20), default=JOB_STATUS_QUEUED, nullable=False)
+    priority = db.Column(db.Integer, default=0)
+    retry_count = db.Column(db.Integer, default=0)
+    max_retries = db.Column(db.Integer, default=3)
+
+    progress = db.Column(JSON, nullable=True)
+    result = db.Column(JSON, nullable=True)
+    error_message = db.Column(db.Text, nullable=True)
+
+    # Lease (visibility timeout): worker giữ job đến locked_until, quá hạn thì worker khác được nhận lại
+    locked_by = db.Column(db.String(255), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    # Thời điểm sớm nhất job được nhận (dùng cho backoff khi retry)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+
+    started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_jobs_status', 'status', 'run_after'),
+        db.Index('idx_jobs_resource', 'resource_type', 'resource_id'),
+    )
@@ -0,0 +1,123 @@
+import hashlib
+import math
+import operator
+import threading
+from array import array
+from datetime import datetime
+from app.core.config import Config
+from app.extensions import db
+from app.models.case import Case, Document
+from app.models.chat import AnswerCacheEntry
+
+try:
+    import numpy
+except ImportError:  # numpy là tùy chọn: thiếu thì tính tích vô hướng bằng Python thuần
+    numpy = None
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+class AnswerCache:
+    """
+    Cache câu trả lời chat theo vụ án: câu hỏi mới có embedding gần câu hỏi cũ (cosine >= ngưỡng)
+    thì trả lại câu trả lời + citations đã lưu, bỏ qua search và gọi LLM.
+    Entry gắn với dấu vân tay của vụ án (master summary + tài liệu); vụ án thay đổi thì entry hết hiệu lực.
+    Không commit: caller commit cùng Message.
+    """
+
+    @staticmethod
+    def case_fingerprint(case_id):
+        master_summary = db.session.query(Case.master_summary).filter_by(id=case_id).scalar()
+        docs = db.session.query(Document.id, Document.content_hash, Document.status).filter_by(
+            case_id=case_id
+        ).order_by(Document.id).all()
+        digest = hashlib.sha256((master_summary or "").encode('utf-8'))
+        for doc in docs:
+            digest.update(f"|{doc.id}:{doc.content_hash}:{doc.status}".encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def lookup(case_id, query_vector):
+        """Trả về (entry hoặc None, fingerprint hiện tại của vụ án)"""
+        if not Config.ANSWER_CACHE_ENABLED:
+            return None, None
+        fingerprint = AnswerCache.case_fingerprint(case_id)
+        # Chỉ so với tối đa ANSWER_CACHE_MAX_PER_CASE entry dùng gần nhất (cùng thứ tự với lúc dọn ở store)
+        rows = db.session.query(AnswerCacheEntry.id, AnswerCacheEntry.embedding).filter_by(
+            case_id=case_id, case_fingerprint=fingerprint
+        ).order_by(
+            db.func.coalesce(AnswerCacheEntry.last_hit_at, AnswerCacheEntry.created_at).desc()
+        ).limit(Config.ANSWER_CACHE_MAX_PER_CASE).all()
+
+        best_id, best_score = None, Config.ANSWER_CACHE_THRESHOLD
+        if rows:
+            for row, score in zip(rows, AnswerCache._scores(rows, _normalize(query_vector))):
+                if score >= best_score:
+                    best_id, best_score = row.id, score
+
+        if best_id is None:
+            answer_cache_metrics.record("misses")
+            return None, fingerprint
+        entry = AnswerCacheEntry.query.get(best_id)
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.utcnow()
+        answer_cache_metrics.record("hits")
+        return entry, fingerprint
+
+    @staticmethod
+    def _scores(rows, query):
+        """Cosine giữa câu hỏi và từng entry (embedding đã chuẩn hóa => tích vô hướng)"""
+        if numpy is not None:
+            matrix = numpy.frombuffer(b"".join(row.embedding for row in rows), dtype=numpy.float32)
+            return (matrix.reshape(len(rows), -1) @ numpy.asarray(query, dtype=numpy.float32)).tolist()
+        return [sum(map(operator.mul, query, array('f', row.embedding))) for row in rows]
+
+    @staticmethod
+    def store(case_id, fingerprint, question, query_vector, answer, citations):
+        if not Config.ANSWER_CACHE_ENABLED or not fingerprint or not answer:
+            return
+        # Dọn entry của các phiên bản cũ của vụ án
+        stale = AnswerCacheEntry.query.filter(
+            AnswerCacheEntry.case_id == case_id,
+            AnswerCacheEntry.case_fingerprint != fingerprint
+        ).delete(synchronize_session=False)
+        if stale:
+            answer_cache_metrics.record("invalidated", stale)
+
+        db.session.add(AnswerCacheEntry(
+            case_id=case_id,
+            case_fingerprint=fingerprint,
+            question=question,
+            embedding=array('f', _normalize(query_vector)).tobytes(),
+            answer=answer,
+            citations=citations
+        ))
+        answer_cache_metrics.record("stores")
+
+        # Giữ tối đa ANSWER_CACHE_MAX_PER_CASE entry mỗi vụ án, bỏ entry lâu không dùng nhất
+        overflow = db.session.query(AnswerCacheEntry.id).filter_by(case_id=case_id).order_by(
+            db.func.coalesce(AnswerCacheEntry.last_hit_at, AnswerCacheEntry.created_at).desc()
+        ).offset(Config.ANSWER_CACHE_MAX_PER_CASE).all()
+        if overflow:
+            AnswerCacheEntry.query.filter(
+                AnswerCacheEntry.id.in_([row.id for row in overflow])
+            ).delete(synchronize_session=False)
+
+class AnswerCacheMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "invalidated": 0}
+
+    def record(self, name, count=1):
+        with self._lock:
+            self.stats[name] += count
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / lookups, 4) if lookups else 0.0
+        return data
+
+answer_cache_metrics = AnswerCacheMetrics()
@@ -1,16 +1,37 @@
+import base64
+import hashlib
+import json
 import threading
-import os
+import uuid
+from datetime import datetime
 from app.models.case import Citation
-from flask import current_app, json
-from app.extensions import db
+from app.core.config import Config
+from app.core.constants import JOB_TYPE_CASE_INGESTION
+from app.extensions import db, get_mistral_client, llm_cache
 from app.models.case import Case, Document
-from ultis.ai_summary import generate_master_summary_with_citations, summarize_document_content
+from app.services.document_page_service import DocumentPageService
+from app.services.ingestion_pipeline import IngestionPipeline
+from app.services.job_service import JobService
+from ultis.ai_summary import build_master_summary
+from ultis.citations import locate_claim, resolve_citations, scan_refs
+from ultis.disk_cache import DiskCache
 from ultis.ocr import ContentExtractionService
 from ultis.storage import StorageService
+from sqlalchemy import tuple_
 from sqlalchemy.orm import joinedload
 
 # Khởi tạo một lần ở cấp module hoặc trong CaseService
-extractor = ContentExtractionService()
+extractor = ContentExtractionService(
+    cache=DiskCache(Config.OCR_CACHE_DIR, Config.OCR_CACHE_MAX_BYTES) if Config.OCR_CACHE_ENABLED else None,
+    upload_mode=Config.OCR_UPLOAD_MODE,
+    split_threshold_pages=Config.OCR_SPLIT_THRESHOLD_PAGES,
+    page_batch_size=Config.OCR_PAGE_BATCH_SIZE,
+    batch_concurrency=Config.OCR_BATCH_CONCURRENCY,
+    client_provider=get_mistral_client
+)
+
+# Giới hạn số tài liệu được xử lý đồng thời trên toàn process (mọi vụ án cộng lại)
+_global_doc_slots = threading.BoundedSemaphore(Config.OCR_GLOBAL_CONCURRENCY)
 
 class CaseService:
     @staticmethod
@@ -23,26 +44,23 @@ class CaseService:
 
             for file in files:
                 # 2. Lưu file vật lý dùng StorageService
-                rel_path = StorageService.save_file(new_case.id, file)
+                rel_path, content_hash, file_size = StorageService.save_file(file)
                 
                 # 3. Lưu bản ghi Document
                 doc = Document(
                     case_id=new_case.id, 
                     file_name=file.filename, 
                     file_url=rel_path,
+                    content_hash=content_hash,
+                    file_size=file_size,
                     status="UPLOADED"
                 )
                 db.session.add(doc)
 
+            # 4. Đưa vào hàng đợi xử lý nền (worker.py), ghi cùng transaction với Case
+            JobService.enqueue(JOB_TYPE_CASE_INGESTION, 'case', new_case.id)
             db.session.commit()
 
-            # 4. Kích hoạt OCR chạy ngầm
-            app = current_app._get_current_object()
-            threading.Thread(
-                target=CaseService._run_background_ocr, 
-                args=(app, new_case.id)
-            ).start()
-
             return new_case
         except Exception as e:
             db.session.rollback()
@@ -50,35 +68,97 @@ class CaseService:
 
     @staticmethod
     def _run_background_ocr(app, case_id):
+        # 1. OCR -> tóm tắt -> index chạy gối đầu qua pipeline asyncio
+        IngestionPipeline(app, extractor, _global_doc_slots).run(case_id)
+
+        # 2. Chỉ tổng hợp khi mọi tài liệu đã xử lý xong
         with app.app_context():
             case = Case.query.get(case_id)
             if not case: return
-            upload_base = app.config['UPLOAD_FOLDER']
-            
-            for doc in case.documents:
-                full_path = os.path.join(upload_base, doc.file_url)
-                # Thực hiện bóc tách nội dung
-                content_pages = extractor.extract_content(full_path)
-                
-                if content_pages:
-                    doc.raw_content = content_pages
-                    # 2. Dùng OpenAI để tóm tắt từ Raw Content đó
-                    summary_text = summarize_document_content(content_pages)
-                    if summary_text:
-                        doc.summary = summary_text
-                    doc.status = "SUCCESS"
-                else:
-                    doc.status = "FAILED"
-                db.session.commit()
-            print("🔗 Generating Master Summary...")
-            CaseService.create_master_summary(case_id)
-            case.status = "COMPLETED"
+            # Còn tài liệu lỗi tạm thời => raise để JobWorker retry (backoff), hết lượt thì finish_after_retries.
+            # Tài liệu lỗi vĩnh viễn (FAILED) không được retry và không chặn master summary
+            pending = Document.query.filter_by(case_id=case_id, status="RETRY").count()
+            if pending:
+                raise RuntimeError(f"{pending} tài liệu của vụ án {case_id} lỗi tạm thời, cần xử lý lại")
+            CaseService._finish_case(case)
+
+    @staticmethod
+    def _finish_case(case):
+        """Master summary từ các tài liệu SUCCESS rồi chốt trạng thái vụ án (không tạo được tổng quan => raise)"""
+        succeeded = Document.query.filter_by(case_id=case.id, status="SUCCESS").count()
+        if case.documents and not succeeded:
+            print(f"❌ Vụ án {case.id}: không tài liệu nào xử lý thành công")
+            case.status = "FAILED"
             db.session.commit()
+            return
+
+        print("🔗 Generating Master Summary...")
+        # Master summary, citations và trạng thái vụ án ghi chung một transaction
+        if not CaseService.create_master_summary(case.id, commit=False):
+            raise RuntimeError(f"Không tạo được master summary cho vụ án {case.id}")
+        case.status = "COMPLETED"
+        db.session.commit()
 
     @staticmethod
-    def get_all_cases():
-        """Lấy danh sách rút gọn các vụ án"""
-        return Case.query.order_by(Case.created_at.desc()).all()
+    def finish_after_retries(app, case_id):
+        """
+        Gọi khi job xử lý vụ án đã hết lượt retry: tài liệu còn lỗi chuyển FAILED, vụ án vẫn có
+        master summary từ các tài liệu đã xong; chỉ FAILED khi không tổng hợp được gì.
+        """
+        with app.app_context():
+            case = Case.query.get(case_id)
+            if not case: return
+            Document.query.filter(
+                Document.case_id == case_id, Document.status.notin_(["SUCCESS", "FAILED"])
+            ).update({"status": "FAILED"}, synchronize_session=False)
+            db.session.commit()
+            try:
+                CaseService._finish_case(case)
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Master Summary [{case_id}] sau lượt retry cuối: {e}")
+                case = Case.query.get(case_id)
+                case.status = "FAILED"
+                db.session.commit()
+
+    @staticmethod
+    def list_cases(limit=20, cursor=None, status=None, title=None):
+        """
+        Danh sách rút gọn các vụ án, mới nhất trước, phân trang keyset theo (created_at, id).
+        Chỉ SELECT các cột cần hiển thị (không tải master_summary). Trả về (rows, next_cursor).
+        """
+        query = db.session.query(Case.id, Case.title, Case.status, Case.created_at)
+        if status:
+            query = query.filter(Case.status == status)
+        if title:
+            # Tìm theo chuỗi con: %, _ người dùng nhập là ký tự thường, không phải wildcard
+            escaped = title.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            query = query.filter(Case.title.ilike(f"%{escaped}%", escape='\\'))
+        if cursor:
+            created_at, case_id = CaseService._decode_cursor(cursor)
+            query = query.filter(tuple_(Case.created_at, Case.id) < tuple_(created_at, case_id))
+
+        rows = query.order_by(Case.created_at.desc(), Case.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = CaseService._encode_cursor(rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    def _encode_cursor(created_at, case_id):
+        raw = json.dumps([created_at.isoformat(), str(case_id)])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            created_at, case_id = json.loads(raw)
+            return datetime.fromisoformat(created_at), uuid.UUID(case_id)
+        except (ValueError, TypeError, AttributeError):
+            # AttributeError: uuid.UUID() nhận giá trị không phải chuỗi (vd. số trong cursor tự sửa)
+            raise ValueError("Cursor không hợp lệ")
 
     @staticmethod
     def get_case_by_id(case_id):
@@ -89,46 +169,132 @@ class CaseService:
         ).filter_by(id=case_id).first()
     
     @staticmethod
-    def create_master_summary(case_id):
+    def get_document_pages(case_id, document_id, start=1, end=None):
+        """Nội dung một khoảng trang của tài liệu (tối đa DOCUMENT_PAGES_MAX_RANGE trang / lần)"""
+        exists = db.session.query(Document.id).filter_by(id=document_id, case_id=case_id).first()
+        if not exists:
+            return None
+        start = max(start or 1, 1)
+        last_allowed = start + Config.DOCUMENT_PAGES_MAX_RANGE - 1
+        end = min(end, last_allowed) if end else last_allowed
+        return {
+            "document_id": str(document_id),
+            "total_pages": DocumentPageService.count_pages(document_id),
+            "start": start,
+            "end": end,
+            "pages": DocumentPageService.get_pages(document_id, start, end)
+        }
+
+    @staticmethod
+    def create_master_summary(case_id, commit=True):
+        """Trả về True khi master summary đã được ghi (hoặc không đổi), False nếu không tạo được"""
         case = Case.query.get(case_id)
-        if not case: return
+        if not case: return False
 
         # 1. Chuẩn bị dữ liệu đầu vào từ các file đã xử lý xong
         doc_summaries = []
+        sources = {}
         for doc in case.documents:
-            if doc.summary:
+            if doc.status == "SUCCESS" and doc.summary:
                 doc_summaries.append({
                     "id": str(doc.id),
                     "name": doc.file_name,
                     "summary": doc.summary
                 })
+                sources[str(doc.id)] = hashlib.sha256(doc.summary.encode('utf-8')).hexdigest()
+        if not doc_summaries:
+            # Không có tài liệu thành công thì không có gì để tổng hợp;
+            # có tài liệu SUCCESS mà không tài liệu nào có tóm tắt là lỗi
+            return not any(doc.status == "SUCCESS" for doc in case.documents)
+
+        # 2. Chỉ gộp tài liệu mới / đổi tóm tắt vào bản tổng quan hiện có;
+        # tạo lại toàn bộ khi chưa có bản cũ hoặc có tài liệu bị bỏ ra khỏi vụ án
+        previous = case.summary_sources or {}
+        changed = [d for d in doc_summaries if previous.get(d['id']) != sources[d['id']]]
+        incremental = bool(case.master_summary_raw and previous) and set(previous) <= set(sources)
+        if incremental and not changed:
+            print(f"ℹ️ Master summary [{case_id}] không đổi, bỏ qua")
+            return True
+
+        existing_citations = {
+            str(row.document_id): row.citation_index
+            for row in db.session.query(Citation.document_id, Citation.citation_index).filter_by(case_id=case_id)
+        }
+        result = build_master_summary(
+            changed if incremental else doc_summaries,
+            current=(case.master_summary_raw, list(existing_citations)) if incremental else None,
+            updated_ids=[d['id'] for d in changed if d['id'] in previous] if incremental else (),
+            group_size=Config.MASTER_SUMMARY_GROUP_SIZE,
+            max_workers=Config.SUMMARIZE_CONCURRENCY,
+            cache=llm_cache
+        )
+        if not result: return False
+        raw_summary, _ = result
 
-        # 2. Gọi OpenAI tạo summary
-        ai_result_raw = generate_master_summary_with_citations(doc_summaries)
-        if not ai_result_raw: return
-        
-        ai_data = json.loads(ai_result_raw)
-        
         # 3. Cập nhật Master Summary cho Case
-        # Thay thế mã [ref: uuid] thành [1], [2] để Frontend hiển thị đẹp
-        final_summary = ai_data['summary']
-        doc_id_map = {doc['id']: i+1 for i, doc in enumerate(doc_summaries)}
-        
-        # Xóa các citation cũ (nếu có) trước khi tạo mới
-        Citation.query.filter_by(case_id=case_id).delete()
-
-        # 4. Lưu Citations vào DB
-        for idx, doc_id in enumerate(ai_data.get('citations', [])):
-            new_citation = Citation(
-                case_id=case_id,
-                document_id=doc_id,
-                citation_index=idx + 1 # Số thứ tự hiển thị [1], [2]...
-            )
-            db.session.add(new_citation)
-            
-            # (Tùy chọn) Re-format mã trích dẫn trong text từ UUID sang [index]
-            final_summary = final_summary.replace(f"[ref: {doc_id}]", f"[{idx + 1}]")
+        # Lấy các mã [ref: uuid] ngay từ text (một lượt quét), chỉ giữ ID thuộc vụ án.
+        # Tài liệu đã được trích dẫn giữ nguyên số thứ tự cũ, tài liệu mới nhận số tiếp theo
+        refs = scan_refs(raw_summary)
+        cited_ids = [doc_id for doc_id in refs if doc_id in sources]
+        next_index = max((index or 0 for index in existing_citations.values()), default=0) + 1
+
+        # Xóa citation của tài liệu không còn được trích dẫn (một câu DELETE)
+        stale = [uuid.UUID(doc_id) for doc_id in existing_citations if doc_id not in cited_ids]
+        if stale:
+            Citation.query.filter(
+                Citation.case_id == case.id, Citation.document_id.in_(stale)
+            ).delete(synchronize_session=False)
+
+        # 4. Lưu Citations vào DB (kèm trang + đoạn trích khớp nhất với câu được trích dẫn)
+        pages_by_doc = DocumentPageService.pages_by_document([uuid.UUID(doc_id) for doc_id in cited_ids])
+        index_map = {}
+        citation_rows = []
+        for doc_id in cited_ids:
+            index = existing_citations.get(doc_id)
+            if index is None:
+                index = next_index # Số thứ tự hiển thị [1], [2]...
+                next_index += 1
+            page_number, snippet = locate_claim(refs[doc_id], pages_by_doc[doc_id])
+            citation_rows.append({
+                "case_id": case.id,
+                "document_id": uuid.UUID(doc_id),
+                "citation_index": index,
+                "page_number": page_number,
+                "snippet": snippet
+            })
+            index_map[doc_id] = index
+        CaseService._upsert_citations(citation_rows)
+
+        # Thay thế mã [ref: uuid] thành [1], [2] để Frontend hiển thị đẹp (một lượt re.sub)
+        final_summary = resolve_citations(raw_summary, index_map)
 
+        case.master_summary_raw = raw_summary
+        case.summary_sources = sources
         case.master_summary = final_summary
-        case.status = "COMPLETED"
-        db.session.commit()
\ No newline at end of file
+        if commit:
+            db.session.commit()
+        return True
+
+    @staticmethod
+    def _upsert_citations(rows):
+        """Ghi cả tập citation bằng MỘT câu INSERT ... ON CONFLICT (case_id, document_id) DO UPDATE"""
+        if not rows:
+            return
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            # DB khác không có ON CONFLICT: xóa rồi chèn lại (executemany)
+            Citation.query.filter(
+                Citation.case_id == rows[0]["case_id"],
+                Citation.document_id.in_([row["document_id"] for row in rows])
+            ).delete(synchronize_session=False)
+            db.session.execute(Citation.__table__.insert(), rows)
+            return
+        stmt = insert(Citation.__table__).values(rows)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["case_id", "document_id"],
+            set_={column: stmt.excluded[column] for column in ("citation_index", "page_number", "snippet")}
+        ))
@@ -1,18 +1,40 @@
-from app.extensions import db, qdrant_client, openai_client
-from app.models.chat import ChatSession, Message
 from app.core.config import Config
-from qdrant_client.http import models as qmodels
+from app.core.constants import JOB_TYPE_CHAT_COMPACTION
+from app.extensions import db, embedding_cache, get_openai_client
+from app.models.chat import ChatSession, Message
+from app.services.answer_cache import AnswerCache
+from app.services.context_builder import ContextBuilder
+from app.services.indexing_service import EMBEDDING_MODEL
+from app.services.job_service import JobService
+from app.services.retrieval_service import HybridRetriever
+from ultis.ai_summary import summarize_chat_history
+from ultis.embedding_cache import embed_with_cache
+from ultis.rate_limit import call_with_retry, estimate_tokens
+from ultis.tokens import count_tokens
 import json
+import threading
+import time
+
+CHAT_MODEL = "gpt-4o"
 
 class ChatService:
     
     @staticmethod
     def get_embedding(text):
-        response = openai_client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
+        # Câu hỏi lặp lại (hoặc UI gửi lại request, khác hoa/thường / khoảng trắng) lấy từ cache, không gọi OpenAI
+        return embed_with_cache([text], EMBEDDING_MODEL, ChatService._embed_texts, embedding_cache, normalize=True)[0]
+
+    @staticmethod
+    def _embed_texts(texts):
+        response = call_with_retry(
+            "openai", EMBEDDING_MODEL,
+            lambda: get_openai_client().embeddings.create(
+                input=texts,
+                model=EMBEDDING_MODEL
+            ),
+            tokens=estimate_tokens(*texts)
         )
-        return response.data[0].embedding
+        return [data.embedding for data in response.data]
 
     @staticmethod
     def create_session(case_id, title=None):
@@ -22,48 +44,33 @@ class ChatService:
         return session
 
     @staticmethod
-    def send_message(session_id, content):
+    def _get_session(session_id):
         session = ChatSession.query.get(session_id)
         if not session:
             raise ValueError("Session not found")
+        return session
 
-        # 1. Save User Message
-        user_msg = Message(session_id=session_id, role='user', content=content)
-        db.session.add(user_msg)
-        
-        # 2. Vector Search (RAG)
-        query_vector = ChatService.get_embedding(content)
-        
-        # IMPORTANT: Filter by CaseID to prevent data leak between cases
-        search_result = qdrant_client.search(
-            collection_name=Config.QDRANT_COLLECTION,
-            query_vector=query_vector,
-            limit=5,
-            query_filter=qmodels.Filter(
-                must=[
-                    qmodels.FieldCondition(
-                        key="caseId",
-                        match=qmodels.MatchValue(value=str(session.case_id))
-                    )
-                ]
-            )
-        )
+    @staticmethod
+    def _build_prompt(session, content, current_message_id=None, query_vector=None):
+        """RAG: tìm ngữ cảnh trong vụ án, trả về (messages gửi LLM, citations)"""
+        # 2. Hybrid Search (BM25 + vector, RRF, rerank tùy chọn)
+        if query_vector is None:
+            query_vector = ChatService.get_embedding(content)
+        # Lấy dư ứng viên để ContextBuilder còn chỗ bỏ chunk trùng lặp
+        hits = HybridRetriever.retrieve(session.case_id, content, query_vector, top_k=Config.RETRIEVAL_TOP_K * 2)
 
-        # 3. Construct Context & Citations
-        context_text = ""
-        citations = []
-        
-        for hit in search_result:
-            payload = hit.payload
-            snippet = payload.get('content', '')
-            context_text += f"Document: {payload.get('fileName')}\nContent: {snippet}\n\n"
-            
-            citations.append({
-                "docId": payload.get('docId'),
-                "fileName": payload.get('fileName'),
-                "content": snippet[:200] + "...", # Preview
-                "page": payload.get('page')
-            })
+        # 3. Construct Context & Citations (trong ngân sách token)
+        builder = ContextBuilder(CHAT_MODEL)
+        selected, context_text = builder.select_chunks(hits)
+        citations = [
+            {
+                "docId": hit['docId'],
+                "fileName": hit['fileName'],
+                "content": hit['content'][:200] + "...", # Preview
+                "page": hit['page']
+            }
+            for hit in selected
+        ]
 
         # 4. LLM Generation
         system_prompt = f"""You are a Legal AI Assistant. Use the following context to answer the user's question. 
@@ -71,12 +78,102 @@ class ChatService:
         Context: 
         {context_text}"""
 
-        completion = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": content}
-            ]
+        history = ChatService._unsummarized_messages(session, exclude_id=current_message_id)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            *builder.history_messages(session.history_summary, history),
+            {"role": "user", "content": content}
+        ]
+        return messages, citations
+
+    @staticmethod
+    def _unsummarized_messages(session, exclude_id=None):
+        query = Message.query.filter(Message.session_id == session.id)
+        if session.summarized_until:
+            query = query.filter(Message.timestamp > session.summarized_until)
+        if exclude_id:
+            query = query.filter(Message.id != exclude_id)
+        return query.order_by(Message.timestamp).all()
+
+    @staticmethod
+    def _history_sizes(messages):
+        return [count_tokens(m.content, CHAT_MODEL) + 4 for m in messages]
+
+    @staticmethod
+    def _schedule_compaction(session):
+        """
+        Gọi sau khi lưu câu trả lời: các lượt chưa tóm tắt vượt ngân sách lịch sử thì đưa việc gộp
+        (gọi LLM) cho worker qua hàng đợi job, request chỉ tốn một lần đếm token cục bộ.
+        """
+        try:
+            messages = ChatService._unsummarized_messages(session)
+            if sum(ChatService._history_sizes(messages)) <= Config.CHAT_HISTORY_TOKEN_BUDGET:
+                return
+            if not JobService.has_active(JOB_TYPE_CHAT_COMPACTION, session.id):
+                JobService.enqueue(JOB_TYPE_CHAT_COMPACTION, 'chat_session', session.id)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Chat History Compact Error: {e}")
+
+    @staticmethod
+    def compact_history(app, session_id):
+        """
+        Job CHAT_COMPACTION (worker): gộp các lượt cũ nhất vào history_summary (còn lại ~nửa ngân sách)
+        để prompt các lượt sau không phình theo độ dài hội thoại. Lỗi => raise để job được retry.
+        """
+        with app.app_context():
+            session = ChatSession.query.get(session_id)
+            if not session:
+                return
+            messages = ChatService._unsummarized_messages(session)
+            sizes = ChatService._history_sizes(messages)
+            total = sum(sizes)
+            if total <= Config.CHAT_HISTORY_TOKEN_BUDGET:
+                return
+
+            folded = []
+            for message, size in zip(messages, sizes):
+                if total <= Config.CHAT_HISTORY_TOKEN_BUDGET // 2:
+                    break
+                folded.append(message)
+                total -= size
+
+            summary = summarize_chat_history(session.history_summary, [(m.role, m.content) for m in folded])
+            if not summary:
+                raise RuntimeError(f"Không tóm tắt được lịch sử chat của phiên {session_id}")
+            session.history_summary = summary
+            session.summarized_until = folded[-1].timestamp
+            db.session.commit()
+
+    @staticmethod
+    def send_message(session_id, content):
+        session = ChatService._get_session(session_id)
+
+        # 1. Save User Message
+        user_msg = Message(session_id=session_id, role='user', content=content)
+        db.session.add(user_msg)
+        db.session.flush()
+
+        # Câu hỏi đã được trả lời trong vụ án (và vụ án chưa thay đổi): dùng lại câu trả lời
+        query_vector = ChatService.get_embedding(content)
+        cached, fingerprint = AnswerCache.lookup(session.case_id, query_vector)
+        if cached:
+            bot_msg = Message(session_id=session_id, role='bot', content=cached.answer, citations=cached.citations)
+            db.session.add(bot_msg)
+            db.session.commit()
+            ChatService._schedule_compaction(session)
+            return bot_msg
+
+        messages, citations = ChatService._build_prompt(session, content, user_msg.id, query_vector)
+
+        completion = call_with_retry(
+            "openai", CHAT_MODEL,
+            lambda: get_openai_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages
+            ),
+            tokens=estimate_tokens(*(m["content"] for m in messages), completion=1000)
         )
         
         bot_response_text = completion.choices[0].message.content
@@ -89,6 +186,158 @@ class ChatService:
             citations=citations
         )
         db.session.add(bot_msg)
+        if ChatService._is_standalone(messages):
+            AnswerCache.store(session.case_id, fingerprint, content, query_vector, bot_response_text, citations)
+        db.session.commit()
+        ChatService._schedule_compaction(session)
+
+        return bot_msg
+
+    @staticmethod
+    def _is_standalone(messages):
+        """
+        Prompt chỉ có system + câu hỏi (không kèm lịch sử): câu trả lời không phụ thuộc hội thoại
+        nên mới được đưa vào AnswerCache.
+        """
+        return len(messages) == 2
+
+    @staticmethod
+    def stream_message(session_id, content):
+        """
+        Bản streaming của send_message: trả về generator các event Server-Sent Events
+        (citations -> token... -> done). Kiểm tra session ngay để API trả lỗi trước khi mở stream.
+        """
+        ChatService._get_session(session_id)
+        return ChatService._stream(session_id, content, time.perf_counter())
+
+    @staticmethod
+    def _stream(session_id, content, started):
+        session = ChatService._get_session(session_id)
+
+        # 1. Save User Message (commit ngay: câu hỏi vẫn được lưu dù client ngắt giữa chừng)
+        user_msg = Message(session_id=session_id, role='user', content=content)
+        db.session.add(user_msg)
+        db.session.commit()
+
+        query_vector = ChatService.get_embedding(content)
+        cached, fingerprint = AnswerCache.lookup(session.case_id, query_vector)
+        if cached:
+            yield from ChatService._stream_cached(session, cached, started)
+            return
+
+        messages, citations = ChatService._build_prompt(session, content, user_msg.id, query_vector)
+        # Gửi citations trước để UI hiển thị nguồn trong lúc chờ câu trả lời
+        yield _sse("citations", citations)
+
+        parts = []
+        ttfb_ms = None
+        completed = False
+        error = None
+        try:
+            stream = call_with_retry(
+                "openai", CHAT_MODEL,
+                lambda: get_openai_client().chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    stream=True
+                ),
+                tokens=estimate_tokens(*(m["content"] for m in messages), completion=1000)
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if ttfb_ms is None:
+                    ttfb_ms = (time.perf_counter() - started) * 1000
+                parts.append(delta)
+                yield _sse("token", {"text": delta})
+            completed = True
+        except Exception as e:
+            print(f"❌ Chat Stream Error: {e}")
+            error = str(e)
+        finally:
+            # Lưu câu trả lời khi stream xong HOẶC khi client ngắt kết nối (GeneratorExit)
+            bot_msg = None
+            if parts:
+                bot_msg = Message(
+                    session_id=session_id,
+                    role='bot',
+                    content="".join(parts),
+                    citations=citations
+                )
+                db.session.add(bot_msg)
+                if completed and ChatService._is_standalone(messages):
+                    AnswerCache.store(session.case_id, fingerprint, content, query_vector, bot_msg.content, citations)
+                db.session.commit()
+                ChatService._schedule_compaction(session)
+            total_ms = (time.perf_counter() - started) * 1000
+            # Không xong và không lỗi => client ngắt kết nối giữa chừng (GeneratorExit)
+            outcome = "completed" if completed else "error" if error else "disconnected"
+            stream_metrics.record(ttfb_ms, total_ms, outcome)
+
+        if error:
+            yield _sse("error", {"message": error})
+        yield _sse("done", {
+            "id": str(bot_msg.id) if bot_msg else None,
+            "ttfb_ms": round(ttfb_ms, 1) if ttfb_ms is not None else None,
+            "total_ms": round(total_ms, 1)
+        })
+
+    @staticmethod
+    def _stream_cached(session, cached, started):
+        """Trả câu trả lời từ AnswerCache theo cùng định dạng event (lưu trước khi gửi)"""
+        bot_msg = Message(session_id=session.id, role='bot', content=cached.answer, citations=cached.citations)
+        db.session.add(bot_msg)
         db.session.commit()
+        ChatService._schedule_compaction(session)
+        ttfb_ms = (time.perf_counter() - started) * 1000
+        stream_metrics.record(ttfb_ms, ttfb_ms, "completed")
+
+        yield _sse("citations", bot_msg.citations or [])
+        yield _sse("token", {"text": bot_msg.content})
+        yield _sse("done", {
+            "id": str(bot_msg.id),
+            "ttfb_ms": round(ttfb_ms, 1),
+            "total_ms": round(ttfb_ms, 1),
+            "cached": True
+        })
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class StreamMetrics:
+    """Thống kê time-to-first-token / tổng thời gian của chat streaming trong process"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.disconnected = 0
+        self.errors = 0
+        self.ttfb_ms = []
+        self.total_ms_sum = 0.0
+
+    def record(self, ttfb_ms, total_ms, outcome):
+        """outcome: "completed" | "disconnected" (client ngắt) | "error" (lỗi từ provider)"""
+        with self._lock:
+            self.streams += 1
+            self.total_ms_sum += total_ms
+            if outcome == "disconnected":
+                self.disconnected += 1
+            elif outcome == "error":
+                self.errors += 1
+            if ttfb_ms is not None:
+                self.ttfb_ms.append(ttfb_ms)
+                del self.ttfb_ms[:-1000]  # Chỉ giữ 1000 mẫu gần nhất
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.ttfb_ms)
+            return {
+                "streams": self.streams,
+                "disconnected": self.disconnected,
+                "errors": self.errors,
+                "ttfb_p50_ms": round(samples[len(samples) // 2], 1) if samples else None,
+                "ttfb_p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else None,
+                "total_avg_ms": round(self.total_ms_sum / self.streams, 1) if self.streams else None
+            }
 
-        return bot_msg
\ No newline at end of file
+stream_metrics = StreamMetrics()
@@ -0,0 +1,71 @@
+import re
+from app.core.config import Config
+from ultis.tokens import count_tokens
+
+WORD_RE = re.compile(r"\w+")
+
+def _shingles(text, size=3):
+    words = WORD_RE.findall(text.casefold())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class ContextBuilder:
+    """
+    Ghép prompt chat trong ngân sách token (đếm cục bộ bằng tiktoken):
+    - Ngữ cảnh: lấy chunk theo điểm giảm dần, bỏ chunk trùng lặp / gối đầu, dừng khi hết ngân sách
+    - Lịch sử: bản tóm tắt hội thoại cũ + các lượt gần nhất vừa ngân sách lịch sử
+    """
+    def __init__(self, model, context_budget=None, history_budget=None, max_chunks=None):
+        self.model = model
+        self.context_budget = context_budget or Config.CHAT_CONTEXT_TOKEN_BUDGET
+        self.history_budget = history_budget or Config.CHAT_HISTORY_TOKEN_BUDGET
+        self.max_chunks = max_chunks or Config.RETRIEVAL_TOP_K
+
+    def select_chunks(self, hits):
+        """Trả về (các chunk được chọn, text ngữ cảnh)"""
+        selected, blocks, seen = [], [], []
+        used = 0
+        for hit in sorted(hits, key=lambda h: h.get("score", 0.0), reverse=True):
+            if len(selected) >= self.max_chunks:
+                break
+            shingles = _shingles(hit["content"])
+            if any(self._overlap(shingles, other) >= Config.CHAT_CONTEXT_DEDUP_THRESHOLD for other in seen):
+                continue
+            block = f"Document: {hit['fileName']} (page {hit['page']})\nContent: {hit['content']}\n\n"
+            tokens = count_tokens(block, self.model)
+            if used + tokens > self.context_budget:
+                continue  # Chunk dài không vừa: thử chunk điểm thấp hơn nhưng ngắn hơn
+            used += tokens
+            seen.append(shingles)
+            selected.append(hit)
+            blocks.append(block)
+        return selected, "".join(blocks)
+
+    @staticmethod
+    def _overlap(a, b):
+        """Tỉ lệ shingle chung so với chunk ngắn hơn (bắt cả trường hợp chunk này nằm trong chunk kia)"""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / min(len(a), len(b))
+
+    def history_messages(self, history_summary, messages):
+        """messages: các Message chưa được tóm tắt, cũ -> mới. Lấy từ mới nhất ngược lại đến khi hết ngân sách"""
+        budget = self.history_budget
+        result = []
+        if history_summary:
+            summary = f"Tóm tắt cuộc hội thoại trước đó:\n{history_summary}"
+            budget -= count_tokens(summary, self.model)
+            result.append({"role": "system", "content": summary})
+
+        recent = []
+        for message in reversed(messages):
+            tokens = count_tokens(message.content, self.model) + 4
+            if tokens > budget:
+                break
+            budget -= tokens
+            recent.append({
+                "role": "assistant" if message.role == "bot" else "user",
+                "content": message.content
+            })
+        return result + recent[::-1]
@@ -0,0 +1,74 @@
+from app.extensions import db
+from app.models.case import Document, DocumentPage
+
+class DocumentPageService:
+    """Đọc / ghi nội dung OCR theo trang (bảng document_pages). Không commit: caller commit."""
+
+    @staticmethod
+    def replace_pages(document_id, pages):
+        """Ghi lại toàn bộ trang của tài liệu (xử lý lại có thể ra số trang khác lần trước)"""
+        DocumentPageService.replace_pages_many({document_id: pages})
+
+    @staticmethod
+    def replace_pages_many(pages_by_document):
+        """Như replace_pages cho nhiều tài liệu: một DELETE + một INSERT executemany"""
+        if not pages_by_document:
+            return
+        DocumentPage.query.filter(
+            DocumentPage.document_id.in_(list(pages_by_document))
+        ).delete(synchronize_session=False)
+        rows = [
+            {"document_id": document_id, "page_number": page["page"], "content": page.get("content") or ""}
+            for document_id, pages in pages_by_document.items()
+            for page in pages
+        ]
+        if rows:
+            db.session.execute(DocumentPage.__table__.insert(), rows)
+
+    @staticmethod
+    def get_pages(document_id, start=None, end=None):
+        """Các trang trong khoảng [start, end] (đánh số từ 1), theo thứ tự trang"""
+        query = db.session.query(DocumentPage.page_number, DocumentPage.content).filter(
+            DocumentPage.document_id == document_id
+        )
+        if start is not None:
+            query = query.filter(DocumentPage.page_number >= start)
+        if end is not None:
+            query = query.filter(DocumentPage.page_number <= end)
+        return [{"page": row.page_number, "content": row.content} for row in query.order_by(DocumentPage.page_number)]
+
+    @staticmethod
+    def count_pages(document_id):
+        return db.session.query(db.func.count(DocumentPage.id)).filter(
+            DocumentPage.document_id == document_id
+        ).scalar()
+
+    @staticmethod
+    def pages_by_document(document_ids):
+        """{document_id (str): [{"page", "content"}, ...]} cho nhiều tài liệu trong một truy vấn"""
+        result = {str(doc_id): [] for doc_id in document_ids}
+        if not document_ids:
+            return result
+        rows = db.session.query(DocumentPage.document_id, DocumentPage.page_number, DocumentPage.content).filter(
+            DocumentPage.document_id.in_(list(document_ids))
+        ).order_by(DocumentPage.document_id, DocumentPage.page_number)
+        for row in rows:
+            result[str(row.document_id)].append({"page": row.page_number, "content": row.content})
+        return result
+
+    @staticmethod
+    def migrate_legacy(batch_size=100):
+        """Chuyển Document.raw_content (JSON) sang document_pages rồi xóa cột cũ. Trả về số tài liệu đã chuyển"""
+        migrated = 0
+        while True:
+            docs = Document.query.options(db.undefer(Document.raw_content)).filter(
+                Document.raw_content.isnot(None)
+            ).limit(batch_size).all()
+            if not docs:
+                return migrated
+            for doc in docs:
+                DocumentPageService.replace_pages(doc.id, doc.raw_content or [])
+                # SQL NULL (gán None sẽ lưu JSON 'null' và vẫn khớp điều kiện lọc)
+                doc.raw_content = db.null()
+            db.session.commit()
+            migrated += len(docs)
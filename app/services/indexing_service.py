@@ -0,0 +1,249 @@
+import asyncio
+import re
+import threading
+import uuid
+import zlib
+from app.core.config import Config
+from ultis.embedding_cache import aembed_with_cache
+from ultis.rate_limit import acall_with_retry, estimate_tokens
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# OpenAI text-embedding-3-small dùng 1536.
+# Nếu bạn dùng text-embedding-3-large có thể lên tới 3072.
+VECTOR_SIZE = 1536
+
+def chunk_text(text, chunk_size=1000, overlap=100):
+    """Cắt text theo câu thành các chunk ~chunk_size ký tự, gối đầu ~overlap ký tự"""
+    if not text: return []
+    sentences = re.split(r'(?<=[.?!])\s+', text)
+    if not sentences: sentences = text.split('\n')
+    chunks = []; current_chunk = []; current_len = 0
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence: continue
+        sent_len = len(sentence)
+        if current_len + sent_len <= chunk_size:
+            current_chunk.append(sentence)
+            current_len += sent_len + 1
+        else:
+            if current_chunk: chunks.append(" ".join(current_chunk))
+            overlap_buffer = []; overlap_len = 0
+            for s in reversed(current_chunk):
+                if overlap_len + len(s) < overlap:
+                    overlap_buffer.insert(0, s)
+                    overlap_len += len(s) + 1
+                else: break
+            current_chunk = list(overlap_buffer)
+            current_len = overlap_len
+            if sent_len > chunk_size:
+                current_chunk.append(sentence)
+                chunks.append(" ".join(current_chunk))
+                current_chunk = []; current_len = 0
+            else:
+                current_chunk.append(sentence)
+                current_len += sent_len + 1
+    if current_chunk: chunks.append(" ".join(current_chunk))
+    return chunks
+
+def chunk_pages(pages, chunk_size=None, overlap=None):
+    """Chunk từng trang riêng để mỗi chunk giữ đúng số trang (phục vụ trích dẫn)"""
+    chunk_size = chunk_size or Config.CHUNK_SIZE
+    overlap = Config.CHUNK_OVERLAP if overlap is None else overlap
+    for page in pages:
+        for idx, text in enumerate(chunk_text(page.get("content") or "", chunk_size, overlap)):
+            yield {"page": page["page"], "chunk": idx, "content": text}
+
+# qdrant_client.http.models được import trong từng hàm: nạp module này (API) không kéo theo SDK Qdrant
+
+def payload_indexes():
+    """Các payload field được filter khi search / xóa => cần keyword index để filtered HNSW không chậm dần"""
+    from qdrant_client.http import models as qmodels
+    return {
+        # is_tenant: Qdrant gom dữ liệu theo caseId trên đĩa, filter theo một vụ án nhanh hơn
+        "caseId": qmodels.KeywordIndexParams(type=qmodels.KeywordIndexType.KEYWORD, is_tenant=True),
+        "docId": qmodels.KeywordIndexParams(type=qmodels.KeywordIndexType.KEYWORD),
+    }
+
+_ready_collections = set()
+_ready_lock = threading.Lock()
+
+def ensure_collection(client, collection_name):
+    """Tạo collection + payload index nếu chưa có (mỗi process chỉ kiểm tra một lần cho mỗi collection)"""
+    from qdrant_client.http import models as qmodels
+
+    key = (id(client), collection_name)
+    with _ready_lock:
+        if key in _ready_collections:
+            return
+        if not client.collection_exists(collection_name):
+            client.create_collection(
+                collection_name=collection_name,
+                vectors_config=qmodels.VectorParams(size=VECTOR_SIZE, distance=qmodels.Distance.COSINE)
+            )
+        existing = client.get_collection(collection_name).payload_schema or {}
+        for field_name, schema in payload_indexes().items():
+            if field_name not in existing:
+                client.create_payload_index(
+                    collection_name=collection_name, field_name=field_name, field_schema=schema, wait=True
+                )
+        _ready_collections.add(key)
+
+def collection_for_case(case_id, layout=None):
+    """
+    Tên collection chứa dữ liệu của một vụ án theo Config.QDRANT_LAYOUT:
+    - "single": một collection chung, tách vụ án bằng filter caseId (đã có payload index)
+    - "partitioned": chia vụ án vào QDRANT_PARTITIONS collection theo hash(caseId)
+    Dù layout nào, search vẫn luôn filter theo caseId để không lộ dữ liệu giữa các vụ án.
+    """
+    layout = layout or Config.QDRANT_LAYOUT
+    if layout == "single":
+        return Config.QDRANT_COLLECTION
+    if layout == "partitioned":
+        partition = zlib.crc32(str(case_id).encode('utf-8')) % Config.QDRANT_PARTITIONS
+        return f"{Config.QDRANT_COLLECTION}_p{partition:03d}"
+    raise ValueError(f"Unknown QDRANT_LAYOUT: {layout}")
+
+def layout_collections(layout):
+    """Toàn bộ collection có thể thuộc một layout"""
+    if layout == "single":
+        return [Config.QDRANT_COLLECTION]
+    return [f"{Config.QDRANT_COLLECTION}_p{i:03d}" for i in range(Config.QDRANT_PARTITIONS)]
+
+def migrate_layout(client, source_layout, target_layout, batch_size=256, delete_source=True):
+    """
+    Chuyển toàn bộ point từ layout nguồn sang layout đích (scroll theo lô, giữ nguyên id/vector/payload).
+    Trả về số point đã chuyển.
+    """
+    from qdrant_client.http import models as qmodels
+
+    if source_layout == target_layout:
+        return 0
+    moved = 0
+    for source in layout_collections(source_layout):
+        if not client.collection_exists(source):
+            continue
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=source, limit=batch_size, offset=offset,
+                with_payload=True, with_vectors=True
+            )
+            by_target = {}
+            for point in points:
+                target = collection_for_case(point.payload.get("caseId"), target_layout)
+                by_target.setdefault(target, []).append(
+                    qmodels.PointStruct(id=point.id, vector=point.vector, payload=point.payload)
+                )
+            for target, target_points in by_target.items():
+                ensure_collection(client, target)
+                client.upsert(collection_name=target, points=target_points, wait=True)
+            moved += len(points)
+            if offset is None:
+                break
+        if delete_source:
+            client.delete_collection(source)
+            with _ready_lock:
+                _ready_collections.discard((id(client), source))
+    return moved
+
+class DocumentIndexer:
+    """
+    Gom chunk của nhiều tài liệu trong cùng một lần xử lý rồi embed theo lô lớn
+    (nhiều text / một lần gọi embeddings.create) và upsert Qdrant theo lô.
+    Dùng trong IngestionPipeline: add_document() cho từng tài liệu, flush() ở cuối.
+    Một lô embed / upsert lỗi không dừng các lô khác: ID các tài liệu có chunk trong lô đó được ghi vào
+    failed_docs để pipeline đánh dấu tài liệu cần xử lý lại.
+    """
+    def __init__(self, openai_client, qdrant, collection_name=None,
+                 embed_batch_size=None, upsert_batch_size=None, cache=None):
+        self.openai = openai_client  # AsyncOpenAI
+        self.qdrant = qdrant
+        # EmbeddingCache: index lại chunk không đổi thì không gọi API
+        self.cache = cache
+        self.collection_name = collection_name or Config.QDRANT_COLLECTION
+        self.embed_batch_size = embed_batch_size or Config.EMBEDDING_BATCH_SIZE
+        self.upsert_batch_size = upsert_batch_size or Config.QDRANT_UPSERT_BATCH_SIZE
+        self._pending = []
+        self._collection_ready = False
+        self.indexed_chunks = 0
+        self.failed_docs = set()
+
+    async def add_document(self, case_id, doc_id, file_name, pages):
+        await self._ensure_collection()
+        # Xóa chunk cũ của tài liệu (xử lý lại có thể sinh ít chunk hơn lần trước)
+        await asyncio.to_thread(self._delete_document_points, doc_id)
+
+        for chunk in chunk_pages(pages):
+            self._pending.append({
+                "id": str(uuid.uuid5(doc_id, f"{chunk['page']}:{chunk['chunk']}")),
+                "doc_id": doc_id,
+                "payload": {
+                    "caseId": str(case_id),
+                    "docId": str(doc_id),
+                    "fileName": file_name,
+                    "page": chunk["page"],
+                    "content": chunk["content"]
+                }
+            })
+
+        while len(self._pending) >= self.embed_batch_size:
+            batch = self._pending[:self.embed_batch_size]
+            del self._pending[:self.embed_batch_size]
+            await self._process(batch)
+
+    async def flush(self):
+        while self._pending:
+            batch = self._pending[:self.embed_batch_size]
+            del self._pending[:self.embed_batch_size]
+            await self._process(batch)
+
+    async def _process(self, batch):
+        try:
+            await self._embed_and_upsert(batch)
+        except Exception as e:
+            doc_ids = {item["doc_id"] for item in batch}
+            self.failed_docs.update(doc_ids)
+            print(f"⚠️ Index Error [{len(batch)} chunks, {len(doc_ids)} tài liệu]: {e}")
+
+    async def _ensure_collection(self):
+        if not self._collection_ready:
+            await asyncio.to_thread(ensure_collection, self.qdrant, self.collection_name)
+            self._collection_ready = True
+
+    async def _embed_and_upsert(self, batch):
+        from qdrant_client.http import models as qmodels
+
+        texts = [item["payload"]["content"] for item in batch]
+        vectors = await aembed_with_cache(texts, EMBEDDING_MODEL, self._embed_texts, self.cache)
+        points = [
+            qmodels.PointStruct(id=item["id"], vector=vector, payload=item["payload"])
+            for item, vector in zip(batch, vectors)
+        ]
+        for start in range(0, len(points), self.upsert_batch_size):
+            await asyncio.to_thread(
+                self.qdrant.upsert,
+                collection_name=self.collection_name,
+                points=points[start:start + self.upsert_batch_size],
+                wait=True
+            )
+        self.indexed_chunks += len(points)
+
+    async def _embed_texts(self, texts):
+        response = await acall_with_retry(
+            "openai", EMBEDDING_MODEL,
+            lambda: self.openai.embeddings.create(input=texts, model=EMBEDDING_MODEL),
+            tokens=estimate_tokens(*texts)
+        )
+        return [data.embedding for data in response.data]
+
+    def _delete_document_points(self, doc_id):
+        from qdrant_client.http import models as qmodels
+
+        self.qdrant.delete(
+            collection_name=self.collection_name,
+            points_selector=qmodels.FilterSelector(
+                filter=qmodels.Filter(
+                    must=[qmodels.FieldCondition(key="docId", match=qmodels.MatchValue(value=str(doc_id)))]
+                )
+            )
+        )
@@ -0,0 +1,233 @@
+import asyncio
+import os
+from sqlalchemy import update
+from app.core.config import Config
+from app.extensions import create_async_openai_client, db, embedding_cache, get_qdrant_client, llm_cache
+from app.models.case import Case, Document
+from app.services.document_page_service import DocumentPageService
+from app.services.indexing_service import DocumentIndexer, collection_for_case
+from ultis.ai_summary import asummarize_document_content
+
+class IngestionPipeline:
+    """
+    Pipeline asyncio xử lý tài liệu của MỘT vụ án theo các stage nối nhau bằng hàng đợi có giới hạn:
+
+        extract (OCR) -> summarize -> index (chunk + embed + upsert Qdrant)
+
+    Mỗi stage có số worker riêng; hàng đợi đầy thì stage trước tự chờ (backpressure), nên các
+    tài liệu chảy gối đầu qua các stage thay vì xử lý xong từng file một.
+    Master summary được tạo sau khi pipeline chạy xong (CaseService._run_background_ocr).
+
+    Trạng thái tài liệu lỗi:
+    - FAILED: lỗi vĩnh viễn (định dạng không hỗ trợ, file không còn), không xử lý lại
+    - RETRY: lỗi có thể tạm thời (API OCR / tóm tắt / index), job retry sẽ xử lý lại
+    """
+    def __init__(self, app, extractor, global_slots):
+        self.app = app
+        self.extractor = extractor
+        # threading.BoundedSemaphore giới hạn số tài liệu OCR đồng thời trên toàn process
+        self.global_slots = global_slots
+        self.openai = None
+        self.indexer = None
+        self.writer = None
+
+    def run(self, case_id):
+        asyncio.run(self._run(case_id))
+
+    async def _run(self, case_id):
+        items = await asyncio.to_thread(self._load_documents, case_id)
+        if not items:
+            return
+
+        # AsyncOpenAI gắn với event loop hiện tại nên mỗi lần chạy tạo client riêng
+        self.openai = create_async_openai_client()
+        self.indexer = DocumentIndexer(
+            self.openai, get_qdrant_client(), collection_for_case(case_id), cache=embedding_cache
+        )
+        self.writer = DocumentWriteBuffer(self.app, Config.PERSIST_BATCH_SIZE, Config.PERSIST_FLUSH_INTERVAL)
+        periodic_flush = asyncio.create_task(self.writer.run_periodic())
+        try:
+            extract_q = asyncio.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+            summarize_q = asyncio.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+            index_q = asyncio.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+
+            workers = (
+                [asyncio.create_task(self._worker(extract_q, self._extract, summarize_q))
+                 for _ in range(min(Config.OCR_CASE_CONCURRENCY, len(items)))] +
+                [asyncio.create_task(self._worker(summarize_q, self._summarize, index_q))
+                 for _ in range(Config.SUMMARIZE_CONCURRENCY)] +
+                [asyncio.create_task(self._worker(index_q, self._index, None))
+                 for _ in range(Config.INDEX_CONCURRENCY)]
+            )
+
+            for item in items:
+                await extract_q.put(item)
+
+            # Worker chỉ task_done() sau khi đã đẩy item sang stage sau, nên join lần lượt là đủ
+            for queue in (extract_q, summarize_q, index_q):
+                await queue.join()
+            # Embed / upsert phần chunk còn lại chưa đủ một lô
+            await self._flush_index()
+
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            periodic_flush.cancel()
+            await asyncio.gather(periodic_flush, return_exceptions=True)
+            try:
+                # Ghi nốt các tài liệu còn trong buffer (kể cả khi pipeline dừng giữa chừng)
+                await self.writer.flush()
+            finally:
+                await self.openai.close()
+
+    async def _worker(self, in_q, stage, out_q):
+        while True:
+            item = await in_q.get()
+            try:
+                result = await stage(item)
+                if result is not None and out_q is not None:
+                    await out_q.put(result)
+            except Exception as e:
+                print(f"❌ Pipeline {stage.__name__} error [{item['file_name']}]: {e}")
+                await self.writer.add(item["id"], status="RETRY")
+            finally:
+                in_q.task_done()
+
+    # ---------- Stages ----------
+
+    async def _extract(self, item):
+        pages = await asyncio.to_thread(self._extract_blocking, item)
+        if not pages:
+            # File không đọc được thì lỗi vĩnh viễn; file hợp lệ mà bóc tách lỗi (vd. Mistral lỗi) thì xử lý lại
+            status = "RETRY" if self.extractor.supports(self._file_path(item)) else "FAILED"
+            print(f"❌ Pipeline _extract error [{item['file_name']}]: không bóc tách được nội dung ({status})")
+            await self.writer.add(item["id"], status=status)
+            return None
+        item["pages"] = pages
+        return item
+
+    def _file_path(self, item):
+        return os.path.join(self.app.config['UPLOAD_FOLDER'], item["file_url"])
+
+    def _extract_blocking(self, item):
+        # Mistral OCR chạy trong thread: ContentExtractionService đã tự chia lô / cache / rate limit
+        with self.global_slots:
+            return self.extractor.extract_content(self._file_path(item), content_hash=item["content_hash"])
+
+    async def _summarize(self, item):
+        summary = await asummarize_document_content(
+            item["pages"], self.openai,
+            window_tokens=Config.SUMMARY_WINDOW_TOKENS,
+            cache=llm_cache,
+            concurrency=Config.SUMMARY_WINDOW_CONCURRENCY
+        )
+        if not summary:
+            # asummarize_document_content trả None khi gọi model lỗi: không ghi SUCCESS thiếu tóm tắt,
+            # _worker đánh dấu tài liệu lỗi để job chạy lại
+            raise RuntimeError("không tạo được tóm tắt tài liệu")
+        await self.writer.add(item["id"], status="SUCCESS", pages=item["pages"], summary=summary)
+        return item
+
+    async def _index(self, item):
+        # Lỗi embed / upsert theo lô được DocumentIndexer ghi vào failed_docs, xử lý ở _flush_index;
+        # lỗi khác (ví dụ xóa chunk cũ) thì _worker đánh dấu RETRY ngay
+        await self.indexer.add_document(item["case_id"], item["id"], item["file_name"], item["pages"])
+        return None
+
+    async def _flush_index(self):
+        await self.indexer.flush()
+        print(f"📚 Indexed {self.indexer.indexed_chunks} chunks")
+        # Tài liệu thiếu chunk trong Qdrant => RETRY (ghi đè SUCCESS), job retry sẽ xử lý và index lại
+        for doc_id in self.indexer.failed_docs:
+            await self.writer.add(doc_id, status="RETRY")
+        if self.indexer.failed_docs:
+            print(f"⚠️ {len(self.indexer.failed_docs)} tài liệu index lỗi, đánh dấu RETRY để xử lý lại")
+
+    # ---------- Blocking helpers (chạy trong thread, mỗi lần một app context / session) ----------
+
+    def _load_documents(self, case_id):
+        with self.app.app_context():
+            case = Case.query.get(case_id)
+            if not case:
+                return []
+            # Job có thể được chạy lại (retry / worker chết giữa chừng): bỏ qua tài liệu đã xong
+            # và tài liệu lỗi vĩnh viễn
+            return [
+                {
+                    "id": doc.id,
+                    "case_id": str(case.id),
+                    "file_name": doc.file_name,
+                    "file_url": doc.file_url,
+                    "content_hash": doc.content_hash
+                }
+                for doc in case.documents if doc.status not in ("SUCCESS", "FAILED")
+            ]
+
+class DocumentWriteBuffer:
+    """
+    Gom kết quả xử lý tài liệu (status / summary / trang OCR) rồi ghi theo lô trong MỘT transaction:
+    bulk UPDATE documents (executemany) + một DELETE và một INSERT executemany cho document_pages.
+    Ghi khi đủ batch_size tài liệu hoặc mỗi flush_interval giây (run_periodic).
+    Lô ghi lỗi được trả lại buffer để lần flush sau ghi lại; lần flush cuối (IngestionPipeline._run)
+    vẫn lỗi thì exception lên tới job => job được retry.
+    Worker chết trước khi ghi thì job được chạy lại: tài liệu chưa SUCCESS sẽ được xử lý lại (có cache OCR / tóm tắt).
+    """
+    def __init__(self, app, batch_size, flush_interval):
+        self.app = app
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = asyncio.Lock()
+
+    async def add(self, doc_id, status, pages=None, summary=None):
+        entry = self._pending.setdefault(doc_id, {"id": doc_id})
+        entry["status"] = status
+        if pages is not None:
+            entry["pages"] = pages
+        if summary:
+            entry["summary"] = summary
+        if len(self._pending) >= self.batch_size:
+            await self._try_flush()
+
+    async def run_periodic(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._try_flush()
+
+    async def _try_flush(self):
+        # Flush giữa chừng lỗi chỉ cảnh báo: dữ liệu vẫn nằm trong buffer, không làm chết worker / task định kỳ
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"⚠️ Persist Error: {e} (giữ {len(self._pending)} tài liệu trong buffer, ghi lại sau)")
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write, list(batch.values()))
+            except Exception:
+                # Trả lô lại buffer; tài liệu đã được add() lại trong lúc ghi thì dữ liệu mới hơn được ưu tiên
+                for doc_id, entry in batch.items():
+                    newer = self._pending.get(doc_id)
+                    self._pending[doc_id] = {**entry, **newer} if newer else entry
+                raise
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                updates = [
+                    {key: entry[key] for key in ("id", "status", "summary") if key in entry}
+                    for entry in batch
+                ]
+                db.session.execute(update(Document), updates)
+                DocumentPageService.replace_pages_many(
+                    {entry["id"]: entry["pages"] for entry in batch if "pages" in entry}
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
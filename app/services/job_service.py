@@ -0,0 +1,133 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from app.core.config import Config
+from app.core.constants import (
+    JOB_STATUS_COMPLETED, JOB_STATUS_FAILED, JOB_STATUS_PROCESSING,
+    JOB_STATUS_QUEUED, JOB_STATUS_RETRYING,
+)
+from app.extensions import db
+from app.models.job import ProcessingJob
+
+class JobService:
+    @staticmethod
+    def enqueue(job_type, resource_type, resource_id, priority=0, max_retries=None):
+        """Thêm job vào hàng đợi. Không commit: job được ghi cùng transaction của caller."""
+        job = ProcessingJob(
+            job_type=job_type,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            priority=priority,
+            max_retries=Config.JOB_MAX_RETRIES if max_retries is None else max_retries,
+            status=JOB_STATUS_QUEUED,
+            run_after=datetime.utcnow()
+        )
+        db.session.add(job)
+        return job
+
+    @staticmethod
+    def has_active(job_type, resource_id):
+        """Resource đã có job cùng loại đang chờ / đang chạy (tránh enqueue trùng)"""
+        return db.session.query(ProcessingJob.query.filter(
+            ProcessingJob.job_type == job_type,
+            ProcessingJob.resource_id == resource_id,
+            ProcessingJob.status.in_([JOB_STATUS_QUEUED, JOB_STATUS_RETRYING, JOB_STATUS_PROCESSING])
+        ).exists()).scalar()
+
+    @staticmethod
+    def claim_next(worker_id, job_types=None):
+        """
+        Nhận job kế tiếp bằng SELECT ... FOR UPDATE SKIP LOCKED để nhiều worker
+        không nhận trùng. Job đang PROCESSING nhưng hết lease (worker chết) cũng được nhận lại.
+        """
+        now = datetime.utcnow()
+        query = ProcessingJob.query.filter(or_(
+            and_(
+                ProcessingJob.status.in_([JOB_STATUS_QUEUED, JOB_STATUS_RETRYING]),
+                ProcessingJob.run_after <= now
+            ),
+            and_(
+                ProcessingJob.status == JOB_STATUS_PROCESSING,
+                ProcessingJob.locked_until < now
+            )
+        ))
+        if job_types:
+            query = query.filter(ProcessingJob.job_type.in_(job_types))
+
+        job = query.order_by(
+            ProcessingJob.priority.desc(), ProcessingJob.created_at
+        ).with_for_update(skip_locked=True).first()
+
+        if not job:
+            db.session.commit()
+            return None
+
+        if job.status == JOB_STATUS_PROCESSING:
+            # Lease hết hạn: tính là một lần thử thất bại để job lỗi không làm sập worker mãi
+            job.retry_count += 1
+            if job.retry_count > job.max_retries:
+                job.status = JOB_STATUS_FAILED
+                job.error_message = f"Lease expired (worker {job.locked_by} did not finish)"
+                job.locked_by = None
+                job.locked_until = None
+                job.completed_at = now
+                db.session.commit()
+                return JobService.claim_next(worker_id, job_types)
+
+        job.status = JOB_STATUS_PROCESSING
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=Config.JOB_VISIBILITY_TIMEOUT)
+        job.started_at = now
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def heartbeat(job_id, worker_id):
+        """Gia hạn lease cho job đang chạy lâu. Trả về False nếu worker đã mất quyền sở hữu job."""
+        updated = ProcessingJob.query.filter_by(
+            id=job_id, locked_by=worker_id, status=JOB_STATUS_PROCESSING
+        ).update({
+            ProcessingJob.locked_until: datetime.utcnow() + timedelta(seconds=Config.JOB_VISIBILITY_TIMEOUT)
+        }, synchronize_session=False)
+        db.session.commit()
+        return updated > 0
+
+    @staticmethod
+    def complete(job_id, worker_id, result=None):
+        job = ProcessingJob.query.get(job_id)
+        if not job or job.locked_by != worker_id:
+            return None
+        job.status = JOB_STATUS_COMPLETED
+        job.result = result
+        job.error_message = None
+        job.locked_by = None
+        job.locked_until = None
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def fail(job_id, worker_id, error):
+        """Ghi nhận lỗi: lên lịch retry với exponential backoff + jitter, hoặc FAILED khi hết lượt."""
+        job = ProcessingJob.query.get(job_id)
+        if not job or job.locked_by != worker_id:
+            return None
+
+        job.retry_count += 1
+        job.error_message = str(error)
+        job.locked_by = None
+        job.locked_until = None
+
+        if job.retry_count > job.max_retries:
+            job.status = JOB_STATUS_FAILED
+            job.completed_at = datetime.utcnow()
+        else:
+            job.status = JOB_STATUS_RETRYING
+            job.run_after = datetime.utcnow() + timedelta(seconds=JobService.backoff_delay(job.retry_count))
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def backoff_delay(retry_count):
+        delay = min(Config.JOB_RETRY_BASE_DELAY * (2 ** (retry_count - 1)), Config.JOB_RETRY_MAX_DELAY)
+        return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,86 @@
+import os
+import signal
+import socket
+import threading
+import traceback
+from app.core.config import Config
+from app.core.constants import JOB_STATUS_FAILED, JOB_TYPE_CASE_INGESTION, JOB_TYPE_CHAT_COMPACTION
+from app.services.case_service import CaseService
+from app.services.chat_service import ChatService
+from app.services.job_service import JobService
+
+# job_type -> (hàm xử lý(app, resource_id), hàm dọn dẹp khi job hỏng hẳn(app, resource_id) hoặc None)
+JOB_HANDLERS = {
+    JOB_TYPE_CASE_INGESTION: (CaseService._run_background_ocr, CaseService.finish_after_retries),
+    JOB_TYPE_CHAT_COMPACTION: (ChatService.compact_history, None),
+}
+
+class JobWorker:
+    """
+    Tiến trình worker tách khỏi API: nhận job từ bảng processing_jobs và xử lý tuần tự.
+    Muốn tăng throughput thì chạy thêm process (python worker.py), không cần sửa API.
+    """
+    def __init__(self, app, worker_id=None, job_types=None):
+        self.app = app
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.job_types = job_types or list(JOB_HANDLERS)
+        self._stop = threading.Event()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+    def _handle_signal(self, signum, frame):
+        # Graceful shutdown: không nhận job mới, chạy nốt job hiện tại rồi thoát
+        print(f"🛑 Worker {self.worker_id} nhận signal {signum}, dừng sau job hiện tại...")
+        self._stop.set()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        print(f"👷 Worker {self.worker_id} started (jobs: {', '.join(self.job_types)})")
+        while not self._stop.is_set():
+            if not self.run_once():
+                self._stop.wait(Config.JOB_POLL_INTERVAL)
+        print(f"👋 Worker {self.worker_id} stopped")
+
+    def run_once(self):
+        """Nhận và xử lý tối đa một job. Trả về False nếu hàng đợi trống."""
+        with self.app.app_context():
+            job = JobService.claim_next(self.worker_id, self.job_types)
+            if not job:
+                return False
+            job_id, job_type, resource_id = job.id, job.job_type, job.resource_id
+
+        handler, on_final_failure = JOB_HANDLERS[job_type]
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, heartbeat_stop), daemon=True)
+        heartbeat.start()
+
+        try:
+            result = handler(self.app, resource_id)
+        except Exception as e:
+            traceback.print_exc()
+            with self.app.app_context():
+                failed = JobService.fail(job_id, self.worker_id, e)
+                if failed and failed.status == JOB_STATUS_FAILED and on_final_failure:
+                    on_final_failure(self.app, resource_id)
+        else:
+            with self.app.app_context():
+                JobService.complete(job_id, self.worker_id, result)
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+        return True
+
+    def _heartbeat(self, job_id, stop_event):
+        """Gia hạn lease định kỳ để job chạy lâu không bị worker khác nhận lại"""
+        interval = max(1, Config.JOB_VISIBILITY_TIMEOUT / 3)
+        while not stop_event.wait(interval):
+            try:
+                with self.app.app_context():
+                    if not JobService.heartbeat(job_id, self.worker_id):
+                        return
+            except Exception as e:
+                print(f"⚠️ Heartbeat error [{job_id}]: {e}")
@@ -0,0 +1,191 @@
+import math
+import re
+import threading
+import unicodedata
+import uuid
+from collections import Counter, OrderedDict
+from app.core.config import Config
+from app.extensions import db, get_qdrant_client
+from app.models.case import Document
+from app.services.document_page_service import DocumentPageService
+from app.services.indexing_service import chunk_pages, collection_for_case
+
+# Giữ nguyên cụm số hiệu văn bản / hợp đồng (vd: 91/2015/QH13, HĐ-12.2023) như một token,
+# đồng thời tách thêm từng phần để vẫn khớp khi người dùng chỉ gõ một phần
+TOKEN_RE = re.compile(r"\w+(?:[./\-]\w+)*")
+COMPOUND_SPLIT_RE = re.compile(r"[./\-]")
+
+def tokenize(text):
+    tokens = []
+    for match in TOKEN_RE.finditer(unicodedata.normalize("NFC", text).casefold()):
+        token = match.group()
+        tokens.append(token)
+        if COMPOUND_SPLIT_RE.search(token):
+            tokens.extend(part for part in COMPOUND_SPLIT_RE.split(token) if part)
+    return tokens
+
+def chunk_id(doc_id, page, chunk_idx):
+    """Cùng công thức với id point trong Qdrant (DocumentIndexer) để ghép kết quả 2 nhánh"""
+    return str(uuid.uuid5(doc_id, f"{page}:{chunk_idx}"))
+
+class LexicalIndex:
+    """Inverted index BM25 (Okapi) trên các chunk của một vụ án"""
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.postings = {}
+        self.doc_lengths = []
+        for idx, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["content"]))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((idx, tf))
+        n = len(chunks)
+        self.avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query, limit):
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for idx, tf in self.postings[term]:
+                norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[idx] / (self.avg_length or 1))
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.chunks[idx], score) for idx, score in ranked]
+
+class HybridRetriever:
+    """
+    Truy xuất lai cho chat: BM25 trên nội dung các trang (document_pages) (bắt số hiệu điều luật, mã hợp đồng, tên đương sự)
+    + dense search Qdrant, gộp bằng Reciprocal Rank Fusion, tùy chọn rerank bằng cross-encoder cục bộ.
+    """
+    _indexes = OrderedDict()  # case_id -> (fingerprint, LexicalIndex), LRU
+    _lock = threading.Lock()
+    _reranker = None
+    _reranker_loaded = False
+
+    @staticmethod
+    def retrieve(case_id, query, query_vector, top_k=None):
+        top_k = top_k or Config.RETRIEVAL_TOP_K
+        candidates = Config.RETRIEVAL_CANDIDATES
+
+        dense = HybridRetriever._dense_search(case_id, query_vector, candidates)
+        lexical = HybridRetriever.get_lexical_index(case_id).search(query, candidates)
+        fused = HybridRetriever._rrf([dense, [chunk for chunk, _ in lexical]])
+
+        reranker = HybridRetriever._get_reranker()
+        if reranker is not None and fused:
+            pool = fused[:Config.RERANK_CANDIDATES]
+            scores = reranker.predict([(query, chunk["content"]) for chunk in pool])
+            for chunk, score in zip(pool, scores):
+                chunk["score"] = float(score)
+            fused = sorted(pool, key=lambda chunk: chunk["score"], reverse=True)
+        return fused[:top_k]
+
+    @staticmethod
+    def _dense_search(case_id, query_vector, limit):
+        from qdrant_client.http import models as qmodels  # import lười: process chỉ nạp SDK khi có câu hỏi chat
+
+        try:
+            # IMPORTANT: Filter by CaseID to prevent data leak between cases
+            result = get_qdrant_client().query_points(
+                collection_name=collection_for_case(case_id),
+                query=query_vector,
+                limit=limit,
+                with_payload=True,
+                query_filter=qmodels.Filter(
+                    must=[
+                        qmodels.FieldCondition(
+                            key="caseId",
+                            match=qmodels.MatchValue(value=str(case_id))
+                        )
+                    ]
+                )
+            )
+        except Exception as e:
+            # Chưa index / Qdrant lỗi: vẫn trả lời được bằng nhánh BM25
+            print(f"⚠️ Dense search error [{case_id}]: {e}")
+            return []
+        return [
+            {
+                "id": str(point.id),
+                "docId": point.payload.get('docId'),
+                "fileName": point.payload.get('fileName'),
+                "page": point.payload.get('page'),
+                "content": point.payload.get('content', '')
+            }
+            for point in result.points
+        ]
+
+    @staticmethod
+    def _rrf(ranked_lists, k=60):
+        """Reciprocal Rank Fusion: score = tổng 1 / (k + thứ hạng) trên các danh sách"""
+        fused = {}
+        for ranked in ranked_lists:
+            for rank, chunk in enumerate(ranked):
+                entry = fused.setdefault(chunk["id"], dict(chunk, score=0.0))
+                entry["score"] += 1.0 / (k + rank + 1)
+        return sorted(fused.values(), key=lambda chunk: chunk["score"], reverse=True)
+
+    @staticmethod
+    def get_lexical_index(case_id):
+        """Index BM25 của vụ án, build lại khi tập tài liệu đã xử lý thay đổi"""
+        rows = db.session.query(Document.id, Document.content_hash).filter_by(
+            case_id=case_id, status="SUCCESS"
+        ).order_by(Document.id).all()
+        fingerprint = tuple((str(row.id), row.content_hash) for row in rows)
+
+        key = str(case_id)
+        with HybridRetriever._lock:
+            cached = HybridRetriever._indexes.get(key)
+            if cached and cached[0] == fingerprint:
+                HybridRetriever._indexes.move_to_end(key)
+                return cached[1]
+
+        index = LexicalIndex(HybridRetriever._load_chunks([row.id for row in rows]))
+        with HybridRetriever._lock:
+            HybridRetriever._indexes[key] = (fingerprint, index)
+            HybridRetriever._indexes.move_to_end(key)
+            while len(HybridRetriever._indexes) > Config.LEXICAL_INDEX_CACHE_CASES:
+                HybridRetriever._indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def _load_chunks(doc_ids):
+        chunks = []
+        if not doc_ids:
+            return chunks
+        docs = db.session.query(Document.id, Document.file_name).filter(Document.id.in_(doc_ids)).all()
+        pages_by_doc = DocumentPageService.pages_by_document(doc_ids)
+        for doc in docs:
+            for chunk in chunk_pages(pages_by_doc[str(doc.id)]):
+                chunks.append({
+                    "id": chunk_id(doc.id, chunk["page"], chunk["chunk"]),
+                    "docId": str(doc.id),
+                    "fileName": doc.file_name,
+                    "page": chunk["page"],
+                    "content": chunk["content"]
+                })
+        return chunks
+
+    @staticmethod
+    def _get_reranker():
+        """Cross-encoder cục bộ (sentence-transformers) nếu cấu hình RERANKER_MODEL; không bắt buộc"""
+        if not Config.RERANKER_MODEL:
+            return None
+        with HybridRetriever._lock:
+            if not HybridRetriever._reranker_loaded:
+                HybridRetriever._reranker_loaded = True
+                try:
+                    from sentence_transformers import CrossEncoder
+                    HybridRetriever._reranker = CrossEncoder(Config.RERANKER_MODEL)
+                except Exception as e:
+                    print(f"⚠️ Reranker disabled ({Config.RERANKER_MODEL}): {e}")
+            return HybridRetriever._reranker
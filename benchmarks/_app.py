@@ -0,0 +1,26 @@
+"""Helper dựng Flask app dùng SQLite tạm cho các benchmark (không cần Postgres / API key thật)."""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="legal_bench_")
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("MISTRAL_API_KEY", "bench")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'bench.db')}"
+
+
+def make_app():
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    app.config['UPLOAD_FOLDER'] = os.path.join(_TMP_DIR, 'uploads')
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def tmp_path(*parts):
+    return os.path.join(_TMP_DIR, *parts)
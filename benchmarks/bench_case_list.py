@@ -0,0 +1,71 @@
+"""
+Benchmark: GET /cases khi bảng cases lớn dần (SQLite tạm).
+
+So sánh cách cũ (tải toàn bộ ORM row, kể cả master_summary, rồi marshal) với
+trang đầu / trang sâu của phân trang keyset (CaseService.list_cases).
+
+    python -m benchmarks.bench_case_list --sizes 1000,10000,100000 --summary-chars 4000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks._app import make_app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--summary-chars", type=int, default=4000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app()
+    from app.extensions import db
+    from app.models.case import Case
+    from app.services.case_service import CaseService
+
+    summary = "Tổng quan vụ án [1]. " * (args.summary_chars // 20)
+    start_time = datetime(2024, 1, 1)
+    inserted = 0
+
+    print(f"{'cases':>8} | {'load all (ms)':>13} | {'page 1 (ms)':>11} | {'page 50 (ms)':>12}")
+    with app.app_context():
+        for size in [int(x) for x in args.sizes.split(",")]:
+            rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "title": f"Vụ án {i}",
+                    "status": "COMPLETED" if i % 3 else "PROCESSING",
+                    "master_summary": summary,
+                    "created_at": start_time + timedelta(seconds=i),
+                    "updated_at": start_time + timedelta(seconds=i)
+                }
+                for i in range(inserted, size)
+            ]
+            db.session.execute(Case.__table__.insert(), rows)
+            db.session.commit()
+            inserted = size
+
+            t = time.perf_counter()
+            cases = Case.query.order_by(Case.created_at.desc()).all()
+            [{"id": str(c.id), "title": c.title, "status": c.status, "created_at": c.created_at} for c in cases]
+            load_all = (time.perf_counter() - t) * 1000
+            db.session.expunge_all()
+
+            t = time.perf_counter()
+            _, cursor = CaseService.list_cases(limit=args.limit)
+            first_page = (time.perf_counter() - t) * 1000
+
+            for _ in range(48):
+                _, cursor = CaseService.list_cases(limit=args.limit, cursor=cursor)
+            t = time.perf_counter()
+            CaseService.list_cases(limit=args.limit, cursor=cursor)
+            deep_page = (time.perf_counter() - t) * 1000
+
+            print(f"{size:>8} | {load_all:>13.1f} | {first_page:>11.2f} | {deep_page:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
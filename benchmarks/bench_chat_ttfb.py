@@ -0,0 +1,96 @@
+"""
+Benchmark: time-to-first-byte của chat, send_message (chờ trọn câu trả lời) so với stream_message (SSE).
+
+LLM được thay bằng stub: chờ --prefill giây rồi sinh --tokens token, mỗi token --token-latency giây.
+Embedding và Qdrant cũng là stub, nên chỉ đo phần chênh lệch do streaming.
+
+    python -m benchmarks.bench_chat_ttfb --tokens 300 --token-latency 0.01
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+from benchmarks._app import make_app
+
+
+class StubCompletions:
+    def __init__(self, prefill, tokens, token_latency):
+        self.prefill = prefill
+        self.tokens = tokens
+        self.token_latency = token_latency
+
+    def create(self, model, messages, stream=False, **kwargs):
+        if not stream:
+            time.sleep(self.prefill + self.tokens * self.token_latency)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="từ " * self.tokens))])
+        return self._stream()
+
+    def _stream(self):
+        time.sleep(self.prefill)
+        for _ in range(self.tokens):
+            time.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="từ "))])
+
+
+class StubQdrant:
+    def query_points(self, **kwargs):
+        return SimpleNamespace(points=[SimpleNamespace(
+            id="p1", score=0.9,
+            payload={"docId": "d1", "fileName": "hop_dong.pdf", "page": 1, "content": "Điều 5. Thanh toán..."})])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prefill", type=float, default=0.4)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    app = make_app()
+    from app.core.config import Config
+    from app.extensions import db
+    from app.models.case import Case
+    from app.services import chat_service
+    from app.services import retrieval_service
+    from app.services.chat_service import ChatService
+
+    stub_openai = SimpleNamespace(chat=SimpleNamespace(
+        completions=StubCompletions(args.prefill, args.tokens, args.token_latency)))
+    stub_qdrant = StubQdrant()
+    chat_service.get_openai_client = lambda: stub_openai
+    retrieval_service.get_qdrant_client = lambda: stub_qdrant
+    chat_service.summarize_chat_history = lambda summary, turns: "Tóm tắt hội thoại."
+    ChatService.get_embedding = staticmethod(lambda text: [0.0] * 8)
+    # Các lần chạy hỏi cùng một câu: tắt cache câu trả lời để đo đúng đường gọi LLM
+    Config.ANSWER_CACHE_ENABLED = False
+
+    with app.app_context():
+        case = Case(title="Bench chat", status="COMPLETED")
+        db.session.add(case)
+        db.session.commit()
+        session_id = ChatService.create_session(case.id).id
+
+        blocking, streaming, totals = [], [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            ChatService.send_message(session_id, "Ai là nguyên đơn?")
+            blocking.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            first_token = None
+            for event in ChatService.stream_message(session_id, "Ai là nguyên đơn?"):
+                if first_token is None and event.startswith("event: token"):
+                    first_token = time.perf_counter() - start
+            streaming.append(first_token)
+            totals.append(time.perf_counter() - start)
+
+    avg = lambda xs: sum(xs) / len(xs) * 1000
+    print(f"{'mode':<22} | {'TTFB avg (ms)':>13} | {'total avg (ms)':>14}")
+    print(f"{'send_message':<22} | {avg(blocking):>13.0f} | {avg(blocking):>14.0f}")
+    print(f"{'stream_message (SSE)':<22} | {avg(streaming):>13.0f} | {avg(totals):>14.0f}")
+    print(f"stream metrics: {chat_service.stream_metrics.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
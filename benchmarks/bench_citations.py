@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: thay mã [ref: uuid] trong master summary dài.
+
+So sánh cách cũ (str.replace một lần cho mỗi citation, quét lại toàn bộ text mỗi lần)
+với ultis.citations.resolve_citations (một lượt re.sub), cùng chi phí scan_refs.
+
+    python -m benchmarks.bench_citations --refs 100,300,1000 --docs 200
+"""
+import argparse
+import random
+import timeit
+import uuid
+
+from ultis.citations import resolve_citations, scan_refs
+
+SENTENCE = "Bị đơn không thực hiện nghĩa vụ thanh toán theo Điều 5 Hợp đồng số 12/2023/HĐMB"
+
+
+def make_summary(n_refs, doc_ids, rng):
+    parts = []
+    for i in range(n_refs):
+        doc_id = rng.choice(doc_ids)
+        # Mỗi 5 mã có một mã viết lệch định dạng như model hay sinh ra
+        marker = f"[Ref:{doc_id.upper()}]" if i % 5 == 0 else f"[ref: {doc_id}]"
+        parts.append(f"{SENTENCE} {marker}.")
+    return " ".join(parts)
+
+
+def replace_per_citation(text, index_map):
+    for doc_id, index in index_map.items():
+        text = text.replace(f"[ref: {doc_id}]", f"[{index}]")
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refs", default="100,300,1000")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    doc_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.docs)]
+    index_map = {doc_id: i + 1 for i, doc_id in enumerate(doc_ids)}
+
+    print(f"{'refs':>6} | {'chars':>8} | {'replace loop (ms)':>17} | {'re.sub (ms)':>11} | {'scan (ms)':>9} | {'missed by loop':>14}")
+    for n_refs in [int(x) for x in args.refs.split(",")]:
+        text = make_summary(n_refs, doc_ids, rng)
+        loop_ms = timeit.timeit(lambda: replace_per_citation(text, index_map), number=args.repeat) / args.repeat * 1000
+        regex_ms = timeit.timeit(lambda: resolve_citations(text, index_map), number=args.repeat) / args.repeat * 1000
+        scan_ms = timeit.timeit(lambda: scan_refs(text), number=args.repeat) / args.repeat * 1000
+        missed = replace_per_citation(text, index_map).lower().count("[ref:")
+        assert "[ref" not in resolve_citations(text, index_map).lower()
+        print(f"{n_refs:>6} | {len(text):>8} | {loop_ms:>17.2f} | {regex_ms:>11.2f} | {scan_ms:>9.2f} | {missed:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: throughput index (chunks/giây) theo kích thước lô embedding, với Qdrant in-memory.
+
+Embedding được thay bằng stub: mỗi lần gọi tốn --call-latency giây (round-trip mạng)
+cộng --per-text-latency giây cho mỗi text, trả về vector ngẫu nhiên.
+
+    python -m benchmarks.bench_indexing --docs 50 --pages 10 --batch-sizes 1,16,64,256
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+SENTENCE = "Bên A có nghĩa vụ thanh toán cho Bên B theo Điều 5 của Hợp đồng số 12/2023/HĐMB. "
+
+
+class StubEmbeddings:
+    def __init__(self, call_latency, per_text_latency, dim):
+        self.call_latency = call_latency
+        self.per_text_latency = per_text_latency
+        self.dim = dim
+        self.calls = 0
+
+    async def create(self, input, model):
+        self.calls += 1
+        await asyncio.sleep(self.call_latency + self.per_text_latency * len(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=[random.random() for _ in range(self.dim)]) for _ in input
+        ])
+
+
+async def run(n_docs, n_pages, batch_size, args):
+    from qdrant_client import QdrantClient
+    from app.services.indexing_service import VECTOR_SIZE, DocumentIndexer
+
+    embeddings = StubEmbeddings(args.call_latency, args.per_text_latency, VECTOR_SIZE)
+    indexer = DocumentIndexer(
+        SimpleNamespace(embeddings=embeddings), QdrantClient(":memory:"),
+        collection_name="bench", embed_batch_size=batch_size, upsert_batch_size=max(batch_size, 64)
+    )
+    case_id = uuid.uuid4()
+    pages = [{"page": p + 1, "content": SENTENCE * 40} for p in range(n_pages)]
+
+    start = time.perf_counter()
+    for i in range(n_docs):
+        await indexer.add_document(case_id, uuid.uuid4(), f"doc_{i}.pdf", pages)
+    await indexer.flush()
+    elapsed = time.perf_counter() - start
+    return indexer.indexed_chunks, embeddings.calls, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--batch-sizes", default="1,16,64,256")
+    parser.add_argument("--call-latency", type=float, default=0.1)
+    parser.add_argument("--per-text-latency", type=float, default=0.001)
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} | {'chunks':>7} | {'API calls':>9} | {'time (s)':>8} | {'chunks/s':>9}")
+    for batch_size in [int(x) for x in args.batch_sizes.split(",")]:
+        chunks, calls, elapsed = asyncio.run(run(args.docs, args.pages, batch_size, args))
+        print(f"{batch_size:>6} | {chunks:>7} | {calls:>9} | {elapsed:>8.2f} | {chunks / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
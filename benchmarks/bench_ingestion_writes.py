@@ -0,0 +1,99 @@
+"""
+Benchmark: số câu SQL / số commit khi xử lý nền một vụ án (SQLite tạm).
+
+OCR, LLM và embedding là stub không độ trễ, nên kết quả chỉ phản ánh chi phí ghi DB:
+ghi từng tài liệu (PERSIST_BATCH_SIZE=1) so với ghi theo lô + upsert citations một câu.
+
+    python -m benchmarks.bench_ingestion_writes --docs 100 --pages 20 --batch 25
+"""
+import argparse
+import json
+import threading
+
+from sqlalchemy import event
+
+from benchmarks._app import make_app
+from benchmarks.bench_parallel_ocr import StubExtractor, run_case
+
+
+class StubPagesExtractor(StubExtractor):
+    def __init__(self, pages):
+        super().__init__(0)
+        self.pages = pages
+
+    def extract_content(self, file_path, *args, **kwargs):
+        return [{"page": i + 1, "content": f"Trang {i + 1} của {file_path}."} for i in range(self.pages)]
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, *args, **kwargs):
+        with self._lock:
+            self.statements += 1
+
+    def _on_commit(self, *args, **kwargs):
+        with self._lock:
+            self.commits += 1
+
+    def reset(self):
+        self.statements = self.commits = 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    app = make_app()
+
+    from app.core.config import Config
+    from app.extensions import db
+    from app.models.case import Document
+    from app.services import case_service, indexing_service, ingestion_pipeline
+    from ultis import ai_summary
+
+    async def fake_summary(pages, client, **kwargs):
+        return "Tóm tắt giả lập"
+
+    async def fake_index(self, case_id, doc_id, file_name, pages):
+        return None
+
+    def fake_master(doc_summaries, **kwargs):
+        # Mỗi tài liệu được trích dẫn một lần -> một citation / tài liệu
+        summary = " ".join(f"Tình tiết của {d['name']} [ref: {d['id']}]." for d in doc_summaries)
+        return json.dumps({"summary": summary, "citations": []})
+
+    def fake_merge(overviews, doc_summaries=(), updated_ids=(), **kwargs):
+        return json.dumps({"summary": " ".join(overviews), "citations": []})
+
+    case_service.extractor = StubPagesExtractor(args.pages)
+    ingestion_pipeline.asummarize_document_content = fake_summary
+    indexing_service.DocumentIndexer.add_document = fake_index
+    ai_summary.generate_master_summary_with_citations = fake_master
+    ai_summary.merge_master_summaries = fake_merge
+
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+
+    print(f"{'mode':>14} | {'docs':>5} | {'statements':>10} | {'commits':>7} | {'wall (s)':>8}")
+    for label, batch in (("per document", 1), (f"batch {args.batch}", args.batch)):
+        Config.PERSIST_BATCH_SIZE = batch
+        counter.reset()
+        elapsed = run_case(app, args.docs, args.concurrency)
+        with app.app_context():
+            ok = Document.query.filter_by(status="SUCCESS").count()
+        print(f"{label:>14} | {args.docs:>5} | {counter.statements:>10} | {counter.commits:>7} | {elapsed:>8.2f}")
+        assert ok >= args.docs
+
+
+if __name__ == "__main__":
+    main()
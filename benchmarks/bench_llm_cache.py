@@ -0,0 +1,97 @@
+"""
+Benchmark: xử lý lại một vụ án (tóm tắt tài liệu + master summary) với / không có LLM cache.
+
+Client OpenAI được thay bằng stub có độ trễ giả lập; đo số lời gọi model và thời gian
+của lần xử lý đầu (cache lạnh) và lần xử lý lại với đầu vào giống hệt (cache nóng).
+
+    python -m benchmarks.bench_llm_cache --docs 20 --pages 20 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from ultis import ai_summary
+from ultis.disk_cache import DiskCache
+from ultis.llm_cache import LLMCache
+
+
+class StubCompletions:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def _response(self, kwargs):
+        self.calls += 1
+        if kwargs.get("response_format"):
+            content = json.dumps({"summary": "Tổng quan giả lập", "citations": []})
+        else:
+            content = f"- Dữ kiện giả lập {self.calls} (tr. 1)"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")])
+
+    def create(self, messages, **kwargs):
+        time.sleep(self.latency)
+        return self._response(kwargs)
+
+
+class AsyncStubCompletions(StubCompletions):
+    async def create(self, messages, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._response(kwargs)
+
+
+def process_case(cases, async_client, cache, window_tokens):
+    async def summarize_all():
+        return await asyncio.gather(*(
+            ai_summary.asummarize_document_content(pages, async_client, window_tokens=window_tokens, cache=cache)
+            for pages in cases
+        ))
+
+    summaries = asyncio.run(summarize_all())
+    doc_summaries = [
+        {"id": f"doc-{i}", "name": f"doc_{i}.pdf", "summary": summary}
+        for i, summary in enumerate(summaries)
+    ]
+    return ai_summary.build_master_summary(doc_summaries, group_size=10, cache=cache)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--window-tokens", type=int, default=6000)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Chỉ đo cache: nâng ngân sách TPM / RPM để rate limiter không làm chậm stub
+    os.environ.setdefault("RATE_LIMIT_OPENAI_TPM", "1000000000")
+    os.environ.setdefault("RATE_LIMIT_OPENAI_RPM", "1000000")
+
+    sync_stub = StubCompletions(args.llm_latency)
+    async_stub = AsyncStubCompletions(args.llm_latency)
+    ai_summary.client = SimpleNamespace(chat=SimpleNamespace(completions=sync_stub))
+    async_client = SimpleNamespace(chat=SimpleNamespace(completions=async_stub))
+
+    cases = [
+        [{"page": p, "content": f"Tài liệu {d} trang {p}: " + "điều khoản hợp đồng mua bán " * 60}
+         for p in range(1, args.pages + 1)]
+        for d in range(args.docs)
+    ]
+
+    print(f"{'run':>12} | {'model calls':>11} | {'wall (s)':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMCache(DiskCache(directory, 256 * 1024 ** 2), max_temperature=0.2)
+        for label, run_cache in (("no cache", None), ("cold cache", cache), ("reprocess", cache)):
+            sync_stub.calls = async_stub.calls = 0
+            start = time.perf_counter()
+            process_case(cases, async_client, run_cache, args.window_tokens)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>12} | {sync_stub.calls + async_stub.calls:>11} | {elapsed:>8.2f}")
+        print(f"cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
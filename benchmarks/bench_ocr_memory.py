@@ -0,0 +1,90 @@
+"""
+Benchmark: peak RSS khi gửi một tài liệu sang OCR, so sánh upload_mode "base64" (cũ) và "file" (stream).
+
+Mỗi phép đo chạy trong subprocess riêng để peak RSS không bị lẫn giữa các lần đo.
+Mistral client được thay bằng stub: upload đọc file theo chunk 64 KB (giống httpx
+multipart), OCR nhận payload và serialize JSON như SDK thật.
+
+    python -m benchmarks.bench_ocr_memory --sizes 10,50,100
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+
+
+class StubFiles:
+    def upload(self, file, purpose=None):
+        stream = file["content"]
+        while stream.read(64 * 1024):
+            pass
+        return SimpleNamespace(id="file-bench")
+
+    def get_signed_url(self, file_id, expiry=24):
+        return SimpleNamespace(url=f"https://files.example/{file_id}")
+
+    def delete(self, file_id):
+        return None
+
+
+class StubOcr:
+    def process(self, model, document, **kwargs):
+        body = json.dumps({"model": model, "document": document})  # SDK serialize request body
+        del body
+        return SimpleNamespace(pages=[SimpleNamespace(index=0, markdown="trang 1")])
+
+
+def _max_rss_mb():
+    # Linux: ru_maxrss tính theo KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, file_path):
+    os.environ.setdefault("MISTRAL_API_KEY", "bench")
+    from ultis.ocr import ContentExtractionService
+
+    stub = SimpleNamespace(files=StubFiles(), ocr=StubOcr())
+    service = ContentExtractionService(upload_mode=mode, client_provider=lambda: stub)
+
+    baseline = _max_rss_mb()
+    pages = service.process_mistral_ocr(file_path)
+    assert pages, "OCR stub failed"
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": _max_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,50,100", help="Kích thước file (MB)")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix="ocr_mem_")
+    print(f"{'size (MB)':>10} | {'base64 peak +MB':>16} | {'file peak +MB':>14}")
+    for size in [int(x) for x in args.sizes.split(",")]:
+        path = os.path.join(tmp_dir, f"doc_{size}.pdf")
+        with open(path, "wb") as f:
+            for _ in range(size):
+                f.write(os.urandom(1024 * 1024))
+
+        row = {}
+        for mode in ("base64", "file"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_ocr_memory", "--child", mode, path],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(out)
+            row[mode] = result["peak_mb"] - result["baseline_mb"]
+        print(f"{size:>10} | {row['base64']:>16.1f} | {row['file']:>14.1f}")
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: thời gian xử lý nền một vụ án theo số lượng tài liệu.
+
+OCR, LLM và embedding được thay bằng stub có độ trễ giả lập, nên kết quả chỉ phản ánh
+chi phí điều phối (1 worker mỗi stage vs. nhiều worker).
+
+    python -m benchmarks.bench_parallel_ocr --ocr-latency 0.3 --llm-latency 0.2
+"""
+import argparse
+import json
+import threading
+import time
+
+from benchmarks._app import make_app
+
+
+class StubExtractor:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def extract_content(self, file_path, *args, **kwargs):
+        time.sleep(self.latency)
+        return [{"page": 1, "content": f"Nội dung giả lập của {file_path}"}]
+
+
+def run_case(app, n_docs, concurrency):
+    from app.core.config import Config
+    from app.extensions import db
+    from app.models.case import Case, Document
+    from app.services import case_service
+
+    Config.OCR_CASE_CONCURRENCY = concurrency
+    Config.SUMMARIZE_CONCURRENCY = concurrency
+    Config.INDEX_CONCURRENCY = concurrency
+    case_service._global_doc_slots = threading.BoundedSemaphore(max(concurrency, 1))
+
+    with app.app_context():
+        case = Case(title=f"Bench {n_docs}", status="PROCESSING")
+        db.session.add(case)
+        db.session.flush()
+        for i in range(n_docs):
+            db.session.add(Document(case_id=case.id, file_name=f"doc_{i}.pdf",
+                                    file_url=f"{case.id}/doc_{i}.pdf", status="UPLOADED"))
+        db.session.commit()
+        case_id = case.id
+
+    start = time.perf_counter()
+    case_service.CaseService._run_background_ocr(app, case_id)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", default="1,5,10,20,40")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ocr-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    app = make_app()
+
+    import asyncio
+    from app.services import case_service, indexing_service, ingestion_pipeline
+    from ultis import ai_summary
+
+    async def fake_summary(pages, client, **kwargs):
+        await asyncio.sleep(args.llm_latency)
+        return "Tóm tắt giả lập"
+
+    async def fake_index(self, case_id, doc_id, file_name, pages):
+        await asyncio.sleep(args.llm_latency)
+
+    def fake_master(doc_summaries, **kwargs):
+        time.sleep(args.llm_latency)
+        return json.dumps({"summary": "Tổng quan giả lập", "citations": []})
+
+    def fake_merge(overviews, doc_summaries=(), updated_ids=(), **kwargs):
+        time.sleep(args.llm_latency)
+        return json.dumps({"summary": "Tổng quan gộp giả lập", "citations": []})
+
+    case_service.extractor = StubExtractor(args.ocr_latency)
+    ingestion_pipeline.asummarize_document_content = fake_summary
+    indexing_service.DocumentIndexer.add_document = fake_index
+    ai_summary.generate_master_summary_with_citations = fake_master
+    # Vụ án > 20 tài liệu đi nhánh map-reduce của build_master_summary (bước reduce gọi merge)
+    ai_summary.merge_master_summaries = fake_merge
+
+    print(f"{'docs':>6} | {'1 worker (s)':>15} | {'pipeline x' + str(args.concurrency) + ' (s)':>15} | {'speedup':>8}")
+    for n in [int(x) for x in args.docs.split(",")]:
+        seq = run_case(app, n, 1)
+        par = run_case(app, n, args.concurrency)
+        print(f"{n:>6} | {seq:>15.2f} | {par:>15.2f} | {seq / par:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Micro-benchmark: chi phí chuẩn bị prompt cho mỗi lần gọi model.
+
+So sánh cách cũ (đọc instruction.txt + example.json từ đĩa mỗi lần, đếm token cả system prompt)
+với prompt registry (bản đã nạp trong bộ nhớ, token phần tĩnh tính sẵn, chỉ kiểm tra mtime định kỳ).
+
+    python -m benchmarks.bench_prompts --repeat 2000
+"""
+import argparse
+import os
+import timeit
+
+from ultis.prompt_registry import PROMPT_DIR, prompts
+from ultis.tokens import count_tokens
+
+
+def read_from_disk(category):
+    files = []
+    for file_name in ("instruction.txt", "example.json"):
+        with open(os.path.join(PROMPT_DIR, category, file_name), "r", encoding="utf-8") as f:
+            files.append(f.read())
+    system = f"{files[0]}\n\n Mẫu kết quả:\n{files[1]}"
+    return system, count_tokens(system, "gpt-4o-mini")
+
+
+def from_registry(category):
+    template = prompts.get(category)
+    return template.system, template.system_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    prompts.load_all()
+    print(f"{'prompt':>14} | {'disk + count (µs)':>17} | {'registry (µs)':>13}")
+    for category in ("summary", "summary_merge"):
+        assert read_from_disk(category) == from_registry(category)
+        disk = timeit.timeit(lambda: read_from_disk(category), number=args.repeat) / args.repeat * 1e6
+        cached = timeit.timeit(lambda: from_registry(category), number=args.repeat) / args.repeat * 1e6
+        print(f"{category:>14} | {disk:>17.1f} | {cached:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: độ trễ search có filter caseId theo kích thước corpus và layout collection.
+
+So sánh:
+  - single (không payload index)   : cách cũ
+  - single + payload index caseId  : layout "single"
+  - partitioned (N collection)     : layout "partitioned"
+
+Mặc định dùng Qdrant in-memory (chế độ local duyệt tuần tự, không dùng HNSW/payload index,
+nên chỉ thấy rõ hiệu quả của việc chia collection). Truyền --url để đo trên Qdrant server thật.
+
+    python -m benchmarks.bench_qdrant_layout --sizes 10000,50000 --url http://localhost:6333
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+
+def build(client, layout, n_points, case_ids, dim, with_index):
+    from qdrant_client.http import models as qmodels
+    from app.services import indexing_service
+    from app.services.indexing_service import collection_for_case, layout_collections
+
+    for name in layout_collections(layout):
+        if client.collection_exists(name):
+            client.delete_collection(name)
+    indexing_service._ready_collections.clear()
+
+    if with_index:
+        for name in layout_collections(layout):
+            indexing_service.ensure_collection(client, name)
+    else:
+        for name in layout_collections(layout):
+            client.create_collection(name, vectors_config=qmodels.VectorParams(size=dim, distance=qmodels.Distance.COSINE))
+
+    batch = {}
+    for i in range(n_points):
+        case_id = random.choice(case_ids)
+        target = collection_for_case(case_id, layout)
+        batch.setdefault(target, []).append(qmodels.PointStruct(
+            id=str(uuid.uuid4()), vector=[random.random() for _ in range(dim)],
+            payload={"caseId": case_id, "docId": str(uuid.uuid4()), "page": 1, "content": "x"}
+        ))
+        if len(batch[target]) >= 512:
+            client.upsert(target, points=batch.pop(target))
+    for target, points in batch.items():
+        client.upsert(target, points=points)
+
+
+def measure(client, layout, case_ids, dim, queries):
+    from qdrant_client.http import models as qmodels
+    from app.services.indexing_service import collection_for_case
+
+    latencies = []
+    for _ in range(queries):
+        case_id = random.choice(case_ids)
+        start = time.perf_counter()
+        client.query_points(
+            collection_name=collection_for_case(case_id, layout),
+            query=[random.random() for _ in range(dim)],
+            limit=5,
+            query_filter=qmodels.Filter(must=[
+                qmodels.FieldCondition(key="caseId", match=qmodels.MatchValue(value=case_id))
+            ])
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), sorted(latencies)[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="5000,20000")
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--url", default=":memory:")
+    args = parser.parse_args()
+
+    from qdrant_client import QdrantClient
+    from app.core.config import Config
+    from app.services import indexing_service
+
+    # Vector nhỏ cho nhanh; layout / filter mới là thứ cần đo
+    dim = 64
+    indexing_service.VECTOR_SIZE = dim
+    Config.QDRANT_COLLECTION = "bench_layout"
+    client = QdrantClient(":memory:") if args.url == ":memory:" else QdrantClient(url=args.url)
+    case_ids = [str(uuid.uuid4()) for _ in range(args.cases)]
+
+    variants = [("single", False, "single, no index"), ("single", True, "single + index"),
+                ("partitioned", True, f"partitioned x{Config.QDRANT_PARTITIONS}")]
+    print(f"{'points':>8} | {'layout':<22} | {'p50 (ms)':>9} | {'p95 (ms)':>9}")
+    for size in [int(x) for x in args.sizes.split(",")]:
+        for layout, with_index, label in variants:
+            build(client, layout, size, case_ids, dim, with_index)
+            p50, p95 = measure(client, layout, case_ids, dim, args.queries)
+            print(f"{size:>8} | {label:<22} | {p50:>9.2f} | {p95:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
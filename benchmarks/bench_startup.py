@@ -0,0 +1,87 @@
+"""
+Benchmark: thời gian khởi động theo vai trò process (mỗi lần đo là một process Python mới, SQLite tạm).
+
+- api:    import run (create_app) rồi request đầu tiên GET /api/v1/cases qua test client
+- worker: import worker (create_app + JobWorker) rồi lần poll hàng đợi đầu tiên (run_once, hàng đợi trống)
+
+In thêm các SDK nặng đã bị import khi xong request / poll đầu tiên.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks._app import tmp_path
+
+HEAVY_MODULES = ("openai", "mistralai", "qdrant_client", "docx", "pypdf", "alembic", "tiktoken")
+
+ROLE_SCRIPTS = {
+    "api": """
+import run
+imported = time.perf_counter()
+response = run.app.test_client().get("/api/v1/cases?limit=20")
+assert response.status_code == 200, response.status_code
+""",
+    "worker": """
+import worker
+from app.services.job_worker import JobWorker
+imported = time.perf_counter()
+JobWorker(worker.app).run_once()
+""",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{body}
+done = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "first_request_s": done - imported,
+    "heavy": [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def run_probe(role, env):
+    code = PROBE.format(body=ROLE_SCRIPTS[role], heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=os.getcwd(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path('startup.db')}",
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-bench"),
+        MISTRAL_API_KEY=os.environ.get("MISTRAL_API_KEY", "bench"),
+        PYTHONPATH=os.getcwd(),
+    )
+    # Schema tạo một lần bằng migrations, giống lúc deploy
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "run", "db", "upgrade"],
+        env=env, check=True, capture_output=True
+    )
+
+    print(f"{'role':>7} | {'import + create_app (s)':>23} | {'first request (s)':>17} | heavy SDKs loaded")
+    for role in ROLE_SCRIPTS:
+        results = [run_probe(role, env) for _ in range(args.runs)]
+        import_s = statistics.median(r["import_s"] for r in results)
+        first_s = statistics.median(r["first_request_s"] for r in results)
+        heavy = ", ".join(results[-1]["heavy"]) or "-"
+        print(f"{role:>7} | {import_s:>23.3f} | {first_s:>17.3f} | {heavy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Schema ban đầu: cases, documents, citations, chat_sessions, messages
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Database tạo trước khi có migrations (db.create_all) đã có sẵn các bảng này: bảng nào có rồi thì bỏ qua,
+nên `flask db upgrade` chạy được trên cả database mới lẫn database cũ.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'cases' not in existing:
+        op.create_table(
+            'cases',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column('title', sa.String(255), nullable=False),
+            sa.Column('master_summary', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+    if 'documents' not in existing:
+        op.create_table(
+            'documents',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column('case_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('cases.id'), nullable=False),
+            sa.Column('file_url', sa.String(500), nullable=False),
+            sa.Column('file_name', sa.String(255), nullable=False),
+            sa.Column('label', sa.String(100), nullable=True),
+            sa.Column('summary', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(50), nullable=True),
+            sa.Column('raw_content', sa.JSON(), nullable=True),
+        )
+    if 'citations' not in existing:
+        op.create_table(
+            'citations',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('case_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('cases.id'), nullable=False),
+            sa.Column('document_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('documents.id'), nullable=False),
+            sa.Column('page_number', sa.Integer(), nullable=True),
+            sa.Column('snippet', sa.Text(), nullable=True),
+            sa.Column('citation_index', sa.Integer(), nullable=True),
+        )
+    if 'chat_sessions' not in existing:
+        op.create_table(
+            'chat_sessions',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column('case_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('cases.id'), nullable=False),
+            sa.Column('title', sa.String(255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+    if 'messages' not in existing:
+        op.create_table(
+            'messages',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column('session_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('chat_sessions.id'), nullable=False),
+            sa.Column('role', sa.String(20), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('citations', postgresql.JSONB(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table('messages')
+    op.drop_table('chat_sessions')
+    op.drop_table('citations')
+    op.drop_table('documents')
+    op.drop_table('cases')
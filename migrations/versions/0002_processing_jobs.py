@@ -0,0 +1,53 @@
+"""Hàng đợi job xử lý nền: bảng processing_jobs
+
+Revision ID: 0002_processing_jobs
+Revises: 0001_baseline
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0002_processing_jobs'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('processing_jobs'):
+        op.create_table(
+            'processing_jobs',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column('job_type', sa.String(50), nullable=False),
+            sa.Column('resource_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('resource_type', sa.String(50), nullable=False),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('priority', sa.Integer(), nullable=True),
+            sa.Column('retry_count', sa.Integer(), nullable=True),
+            sa.Column('max_retries', sa.Integer(), nullable=True),
+            sa.Column('progress', sa.JSON(), nullable=True),
+            sa.Column('result', sa.JSON(), nullable=True),
+            sa.Column('error_message', sa.Text(), nullable=True),
+            sa.Column('locked_by', sa.String(255), nullable=True),
+            sa.Column('locked_until', sa.DateTime(), nullable=True),
+            sa.Column('run_after', sa.DateTime(), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('completed_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('processing_jobs')}
+    if 'idx_jobs_status' not in indexes:
+        op.create_index('idx_jobs_status', 'processing_jobs', ['status', 'run_after'])
+    if 'idx_jobs_resource' not in indexes:
+        op.create_index('idx_jobs_resource', 'processing_jobs', ['resource_type', 'resource_id'])
+
+
+def downgrade():
+    op.drop_index('idx_jobs_resource', table_name='processing_jobs')
+    op.drop_index('idx_jobs_status', table_name='processing_jobs')
+    op.drop_table('processing_jobs')
@@ -0,0 +1,34 @@
+"""Lưu file theo nội dung: documents.content_hash, documents.file_size
+
+Revision ID: 0003_document_content_hash
+Revises: 0002_processing_jobs
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_document_content_hash'
+down_revision = '0002_processing_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('documents')}
+    if 'content_hash' not in columns:
+        op.add_column('documents', sa.Column('content_hash', sa.String(64), nullable=True))
+    if 'file_size' not in columns:
+        op.add_column('documents', sa.Column('file_size', sa.BigInteger(), nullable=True))
+    indexes = {index['name'] for index in inspector.get_indexes('documents')}
+    if 'ix_documents_content_hash' not in indexes:
+        op.create_index('ix_documents_content_hash', 'documents', ['content_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_documents_content_hash', table_name='documents')
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('file_size')
+        batch_op.drop_column('content_hash')
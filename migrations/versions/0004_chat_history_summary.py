@@ -0,0 +1,29 @@
+"""Rolling summary hội thoại: chat_sessions.history_summary, chat_sessions.summarized_until
+
+Revision ID: 0004_chat_history_summary
+Revises: 0003_document_content_hash
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_chat_history_summary'
+down_revision = '0003_document_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('chat_sessions')}
+    if 'history_summary' not in columns:
+        op.add_column('chat_sessions', sa.Column('history_summary', sa.Text(), nullable=True))
+    if 'summarized_until' not in columns:
+        op.add_column('chat_sessions', sa.Column('summarized_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('chat_sessions') as batch_op:
+        batch_op.drop_column('summarized_until')
+        batch_op.drop_column('history_summary')
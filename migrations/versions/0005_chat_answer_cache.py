@@ -0,0 +1,41 @@
+"""Cache câu trả lời chat theo vụ án: bảng chat_answer_cache
+
+Revision ID: 0005_chat_answer_cache
+Revises: 0004_chat_history_summary
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0005_chat_answer_cache'
+down_revision = '0004_chat_history_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('chat_answer_cache'):
+        op.create_table(
+            'chat_answer_cache',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column('case_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('cases.id'), nullable=False),
+            sa.Column('case_fingerprint', sa.String(64), nullable=False),
+            sa.Column('question', sa.Text(), nullable=False),
+            sa.Column('embedding', sa.LargeBinary(), nullable=False),
+            sa.Column('answer', sa.Text(), nullable=False),
+            sa.Column('citations', postgresql.JSONB(), nullable=True),
+            sa.Column('hit_count', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        )
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('chat_answer_cache')}
+    if 'idx_answer_cache_case' not in indexes:
+        op.create_index('idx_answer_cache_case', 'chat_answer_cache', ['case_id', 'case_fingerprint'])
+
+
+def downgrade():
+    op.drop_index('idx_answer_cache_case', table_name='chat_answer_cache')
+    op.drop_table('chat_answer_cache')
@@ -0,0 +1,29 @@
+"""Master summary tăng dần: cases.master_summary_raw, cases.summary_sources
+
+Revision ID: 0006_case_summary_sources
+Revises: 0005_chat_answer_cache
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_case_summary_sources'
+down_revision = '0005_chat_answer_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('cases')}
+    if 'master_summary_raw' not in columns:
+        op.add_column('cases', sa.Column('master_summary_raw', sa.Text(), nullable=True))
+    if 'summary_sources' not in columns:
+        op.add_column('cases', sa.Column('summary_sources', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('cases') as batch_op:
+        batch_op.drop_column('summary_sources')
+        batch_op.drop_column('master_summary_raw')
@@ -0,0 +1,28 @@
+"""GET /cases phân trang keyset: index (created_at, id) và (status, created_at, id)
+
+Revision ID: 0007_cases_list_indexes
+Revises: 0006_case_summary_sources
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_cases_list_indexes'
+down_revision = '0006_case_summary_sources'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('cases')}
+    if 'idx_cases_created' not in indexes:
+        op.create_index('idx_cases_created', 'cases', ['created_at', 'id'])
+    if 'idx_cases_status_created' not in indexes:
+        op.create_index('idx_cases_status_created', 'cases', ['status', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_cases_status_created', table_name='cases')
+    op.drop_index('idx_cases_created', table_name='cases')
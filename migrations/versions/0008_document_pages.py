@@ -0,0 +1,34 @@
+"""Nội dung OCR theo trang: bảng document_pages
+
+Revision ID: 0008_document_pages
+Revises: 0007_cases_list_indexes
+Create Date: 2026-10-17 00:00:00
+
+Dữ liệu cũ trong documents.raw_content chuyển sang bằng `flask documents migrate-pages`.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0008_document_pages'
+down_revision = '0007_cases_list_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('document_pages'):
+        op.create_table(
+            'document_pages',
+            sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+            sa.Column('document_id', postgresql.UUID(as_uuid=True),
+                      sa.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('page_number', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.UniqueConstraint('document_id', 'page_number', name='uq_document_pages_page'),
+        )
+
+
+def downgrade():
+    op.drop_table('document_pages')
@@ -0,0 +1,36 @@
+"""Upsert citation theo (case_id, document_id): xóa bản trùng rồi thêm uq_citations_case_document
+
+Revision ID: 0009_citations_unique
+Revises: 0008_document_pages
+Create Date: 2026-10-17 00:00:00
+
+Mỗi tài liệu chỉ có một citation trong tổng quan vụ án; CaseService._upsert_citations dùng
+ON CONFLICT (case_id, document_id) nên cần constraint này. Bản trùng giữ dòng mới nhất (id lớn nhất).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_citations_unique'
+down_revision = '0008_document_pages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    constraints = {constraint['name'] for constraint in inspector.get_unique_constraints('citations')}
+    if 'uq_citations_case_document' in constraints:
+        return
+
+    op.execute(
+        "DELETE FROM citations WHERE id NOT IN ("
+        "SELECT MAX(id) FROM citations GROUP BY case_id, document_id)"
+    )
+    with op.batch_alter_table('citations') as batch_op:
+        batch_op.create_unique_constraint('uq_citations_case_document', ['case_id', 'document_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('citations') as batch_op:
+        batch_op.drop_constraint('uq_citations_case_document', type_='unique')
@@ -1,97 +1,342 @@
+import asyncio
+import json
 import os
-from openai import OpenAI  # Sử dụng thư viện OpenAI chính thức
+from concurrent.futures import ThreadPoolExecutor
+from ultis.prompt_registry import prompts
+from ultis.rate_limit import acall_with_retry, call_with_retry, estimate_tokens
+from ultis.tokens import count_tokens
 
-# Khởi tạo client OpenAI
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Client OpenAI: app gán client_provider = app.extensions.get_openai_client (dùng chung pool kết nối);
+# gán thẳng `client` để thay client (script / benchmark). Không có cả hai thì tự tạo lúc gọi model lần đầu
+client = None
+client_provider = None
 
-def get_prompt_content(category, file_name):
+def get_client():
+    global client
+    if client is not None:
+        return client
+    if client_provider is not None:
+        return client_provider()
+    from openai import OpenAI  # Sử dụng thư viện OpenAI chính thức
+    # Retry do ultis.rate_limit đảm nhiệm nên tắt retry nội bộ của SDK
+    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)
+    return client
+
+def _render(name, **values):
     """
-    Đọc nội dung file prompt dựa trên thư mục phân loại.
-    :param category: Tên thư mục con (ví dụ: 'summary' hoặc 'summary_document')
-    :param file_name: Tên file cần đọc ('instruction.txt', 'example.json')
+    (template, user prompt, số token đầu vào ước lượng) của prompt trong registry.
+    Phần tĩnh (system + khung template) đã đếm sẵn lúc nạp, chỉ ước lượng phần biến.
     """
-    # Lấy đường dẫn đến thư mục 'ultis' (nơi chứa file ai_summary.py)
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Xây dựng đường dẫn: ultis -> prompt -> [category] -> [file_name]
-    full_path = os.path.join(base_dir, 'prompt', category, file_name)
-    
-    try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        print(f"❌ Không tìm thấy file: {full_path}")
-        return ""
-
-def generate_master_summary_with_citations(doc_summaries):
-    # 1. Load Instruction và Example từ folder 'summary'
-    instruction = get_prompt_content('summary', 'instruction.txt')
-    example = get_prompt_content('summary', 'example.json')
-
-    if not instruction or not example:
-        return None
+    template = prompts.get(name)
+    prompt = template.render(**values)
+    return template, prompt, template.static_tokens + estimate_tokens(*(str(v) for v in values.values()))
 
-    # 2. Tạo context từ dữ liệu đầu vào
-    context_list = "\n".join([
-        f"TÀI LIỆU [{i+1}]: ID: {d['id']}, File: {d['name']}\nNội dung: {d['summary']}\n"
+def _completion(response):
+    """(nội dung, finish_reason) của chat completion; finish_reason == "length" => bị cắt, không cache"""
+    choice = response.choices[0]
+    return choice.message.content, choice.finish_reason
+
+def _format_doc_summaries(doc_summaries, updated_ids=()):
+    return "\n".join([
+        f"TÀI LIỆU [{i+1}]{' (CẬP NHẬT)' if d['id'] in updated_ids else ''}: ID: {d['id']}, File: {d['name']}\nNội dung: {d['summary']}\n"
         for i, d in enumerate(doc_summaries)
     ])
 
+MASTER_SUMMARY_PARAMS = {
+    "model": "gpt-4o-mini",
+    "response_format": { "type": "json_object" },
+    "temperature": 0.2
+}
+
+def _request_master_summary(category, user_content, cache=None):
+    """
+    Gọi model với instruction / example của category, trả về JSON string {summary, citations} hoặc None.
+    cache: ultis.llm_cache.LLMCache, đầu vào giống hệt (xử lý lại vụ án) thì không gọi lại model
+    """
+    # 1. Instruction + Example đã ghép sẵn trong prompt registry (không đọc file mỗi lần gọi)
+    try:
+        template = prompts.get(category)
+    except KeyError as e:
+        print(f"❌ {e}")
+        return None
+
     # 3. Thực hiện gọi OpenAI
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": f"{instruction}\n\n Mẫu kết quả:\n{example}"},
-                {"role": "user", "content": f"Danh sách tài liệu:\n{context_list}"}
-            ],
-            response_format={ "type": "json_object" },
-            temperature=0.2
-        )
-        return response.choices[0].message.content
+        messages = [
+            {"role": "system", "content": template.system},
+            {"role": "user", "content": user_content}
+        ]
+
+        def call():
+            response = call_with_retry(
+                "openai", MASTER_SUMMARY_PARAMS["model"],
+                lambda: get_client().chat.completions.create(messages=messages, **MASTER_SUMMARY_PARAMS),
+                tokens=template.system_tokens + estimate_tokens(user_content, completion=4000)
+            )
+            return _completion(response)
+
+        if cache is None:
+            return call()[0]
+        return cache.complete(template.fingerprint, MASTER_SUMMARY_PARAMS, messages, call,
+                              validate=_valid_master_summary)
     except Exception as e:
         print(f"❌ Master Summary Error: {e}")
         return None
 
-def summarize_document_content(pages_data):
+def generate_master_summary_with_citations(doc_summaries, cache=None):
+    # 2. Tạo context từ dữ liệu đầu vào
+    context_list = _format_doc_summaries(doc_summaries)
+    return _request_master_summary('summary', f"Danh sách tài liệu:\n{context_list}", cache)
+
+def merge_master_summaries(overviews, doc_summaries=(), updated_ids=(), cache=None):
     """
-    Sử dụng GPT-4o để tóm tắt nội dung hồ sơ pháp lý.
+    Hợp nhất các bản tổng quan đã có (giữ mã [ref: ID]) với tóm tắt tài liệu mới / cập nhật.
+    Dùng cho cả cập nhật tăng dần lẫn bước reduce của cây map-reduce.
     """
+    parts = [
+        f"BẢN TỔNG QUAN [{i+1}]:\n{overview}\n"
+        for i, overview in enumerate(overviews)
+    ]
+    if doc_summaries:
+        parts.append(f"Danh sách tài liệu mới / cập nhật:\n{_format_doc_summaries(doc_summaries, updated_ids)}")
+    elif updated_ids:
+        # Bước reduce: tóm tắt mới của tài liệu cập nhật đã nằm trong các bản tổng quan bộ phận
+        parts.append(f"Tài liệu CẬP NHẬT (bỏ thông tin cũ của các ID này trong bản tổng quan vụ án hiện tại): {', '.join(updated_ids)}")
+    return _request_master_summary('summary_merge', "\n".join(parts), cache)
+
+def _valid_master_summary(raw):
+    """JSON object có khóa 'summary' (kiểm tra trước khi lưu vào LLM cache)"""
     try:
-        # Gom text từ các trang, đánh dấu rõ ràng để AI không bị nhầm lẫn
-        full_text = "\n".join([f"### TRANG {p['page']}: {p['content']}" for p in pages_data])
-        
-        # GPT-4o có context window lớn (128k), nhưng tóm tắt file đơn lẻ 
-        # thì 15k-20k tokens đầu là đủ để nắm nội dung chính.
-        input_text = full_text[:25000] 
-
-        prompt = f"""
-        Bạn là một Luật sư cao cấp với khả năng phân tích hồ sơ nhạy bén. 
-        Hãy tóm tắt tài liệu dưới đây một cách súc tích nhưng đầy đủ các thông tin then chốt.
-
-        YÊU CẦU:
-        1. Tóm tắt nội dung chính trong khoảng 3-5 câu.
-        2. Gạch đầu dòng các thực thể quan trọng: Loại tài liệu, Nguyên đơn, Bị đơn, Ngày ký kết/Ngày xảy ra sự việc.
-        3. Văn phong: Chuyên nghiệp, khách quan, thuật ngữ pháp lý chính xác.
-
-        NỘI DUNG TÀI LIỆU:
-        {input_text}
-        
-        BẢN TÓM TẮT PHÁP LÝ:
-        """
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Hoặc "gpt-4-turbo"
-            messages=[
-                {"role": "system", "content": "Bạn là chuyên gia bóc tách dữ liệu cho hệ thống quản lý án phí và hồ sơ tòa án."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0, # Giữ độ chính xác tuyệt đối, tránh sáng tạo
-            max_tokens=1000
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(data, dict) and 'summary' in data
+
+def _parse_master_summary(raw):
+    try:
+        data = json.loads(raw)
+        return data['summary'], list(data.get('citations', []))
+    except (TypeError, ValueError, KeyError):
+        print("❌ Master Summary Error: kết quả không đúng định dạng JSON")
+        return None
+
+def build_master_summary(doc_summaries, current=None, updated_ids=(), group_size=20, max_workers=4, cache=None):
+    """
+    Tạo / cập nhật tổng quan vụ án, trả về (summary còn mã [ref: ID], citations) hoặc None.
+    - current: (summary, citations) hiện có => chỉ gộp doc_summaries (tài liệu mới / đổi) vào
+    - Nhiều tài liệu: map (tóm tắt từng nhóm group_size tài liệu, song song) rồi reduce theo cây,
+      mỗi lần gộp tối đa group_size bản tổng quan, thay vì một prompt chứa toàn bộ vụ án.
+    - cache: ultis.llm_cache.LLMCache cho từng lời gọi model (nhóm nào không đổi thì không gọi lại)
+    """
+    groups = [doc_summaries[i:i + group_size] for i in range(0, len(doc_summaries), group_size)]
+
+    if current is None and len(groups) == 1:
+        return _parse_master_summary(generate_master_summary_with_citations(groups[0], cache=cache))
+    if current is not None and len(groups) <= 1:
+        return _parse_master_summary(merge_master_summaries([current[0]], doc_summaries, updated_ids, cache=cache))
+
+    # Map: mỗi nhóm tài liệu -> một bản tổng quan bộ phận
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        partials = list(pool.map(lambda g: _parse_master_summary(generate_master_summary_with_citations(g, cache=cache)), groups))
+    if any(p is None for p in partials):
+        return None
+    if current is not None:
+        # Bản tổng quan hiện tại đứng đầu để model ưu tiên giữ cấu trúc cũ
+        partials.insert(0, current)
+
+    # Reduce: gộp dần theo tầng đến khi còn một bản
+    while len(partials) > 1:
+        levels = [partials[i:i + group_size] for i in range(0, len(partials), group_size)]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            merged = list(pool.map(
+                lambda level: level[0] if len(level) == 1 else _parse_master_summary(
+                    merge_master_summaries([summary for summary, _ in level], updated_ids=updated_ids, cache=cache)
+                ),
+                levels
+            ))
+        if any(m is None for m in merged):
+            return None
+        partials = merged
+    return partials[0]
+
+# Tham số gọi model dùng chung cho bản sync và async (prompt: ultis/prompt/summary_document, summary_window)
+DOCUMENT_SUMMARY_PARAMS = {
+    "model": "gpt-4o-mini",  # Hoặc "gpt-4-turbo"
+    "temperature": 0, # Giữ độ chính xác tuyệt đối, tránh sáng tạo
+    "max_tokens": 1000
+}
+# Tài liệu dài: chia cửa sổ theo token (map) rồi gộp các bản tóm tắt phần (reduce).
+# Kích thước cửa sổ do caller truyền vào (app: Config.SUMMARY_WINDOW_TOKENS)
+WINDOW_SUMMARY_MAX_TOKENS = 500
+
+def _page_windows(sections, window_tokens):
+    """
+    Gom các đoạn liên tiếp (first_page, last_page, text) thành cửa sổ <= window_tokens token.
+    Đoạn dài hơn một cửa sổ bị cắt theo ký tự thành nhiều phần (giữ số trang).
+    """
+    model = DOCUMENT_SUMMARY_PARAMS["model"]
+    # Chừa chỗ cho phần tĩnh của prompt (đã đếm sẵn trong registry).
+    # Cửa sổ phải chứa được vài bản tóm tắt phần, nếu không bước reduce không hội tụ
+    overhead = max(prompts.get('summary_window').static_tokens, prompts.get('summary_document').static_tokens)
+    window_tokens = max(window_tokens - overhead, 4 * WINDOW_SUMMARY_MAX_TOKENS)
+    windows = []
+    current, current_tokens = [], 0
+    for first_page, last_page, text in sections:
+        tokens = count_tokens(text, model)
+        parts = max(1, -(-tokens // window_tokens))
+        step = -(-len(text) // parts)
+        for start in range(0, len(text), step):
+            piece = text[start:start + step]
+            piece_tokens = tokens // parts + 1
+            if current and current_tokens + piece_tokens > window_tokens:
+                windows.append(current)
+                current, current_tokens = [], 0
+            current.append((first_page, last_page, piece))
+            current_tokens += piece_tokens
+    if current:
+        windows.append(current)
+    return [
+        {
+            "first_page": window[0][0],
+            "last_page": window[-1][1],
+            "text": "\n".join(piece for _, _, piece in window)
+        }
+        for window in windows
+    ]
+
+def _build_window_summary_prompt(window):
+    return _render('summary_window', first_page=window['first_page'], last_page=window['last_page'], text=window['text'])
+
+def _build_document_summary_prompt(input_text, partial=False):
+    source_note = ""
+    if partial:
+        # Tài liệu dài: đầu vào là các bản tóm tắt từng phần thay vì toàn văn
+        source_note = "Nội dung dưới đây là các bản tóm tắt theo từng phần của tài liệu, giữ lại chú thích (tr. N) cho các dữ kiện chính."
+    return _render('summary_document', source_note=source_note, input_text=input_text)
+
+def _summary_messages(template, prompt):
+    return [
+        {"role": "system", "content": template.system},
+        {"role": "user", "content": prompt}
+    ]
+
+def _complete_summary(request, max_tokens, cache=None):
+    template, prompt, prompt_tokens = request
+    params = dict(DOCUMENT_SUMMARY_PARAMS, max_tokens=max_tokens)
+    messages = _summary_messages(template, prompt)
+
+    def call():
+        response = call_with_retry(
+            "openai", params["model"],
+            lambda: get_client().chat.completions.create(messages=messages, **params),
+            tokens=prompt_tokens + max_tokens
         )
-        
-        return response.choices[0].message.content
+        return _completion(response)
+
+    if cache is None:
+        return call()[0]
+    return cache.complete(template.fingerprint, params, messages, call)
+
+async def _acomplete_summary(async_client, request, max_tokens, cache=None):
+    template, prompt, prompt_tokens = request
+    params = dict(DOCUMENT_SUMMARY_PARAMS, max_tokens=max_tokens)
+    messages = _summary_messages(template, prompt)
+
+    async def call():
+        response = await acall_with_retry(
+            "openai", params["model"],
+            lambda: async_client.chat.completions.create(messages=messages, **params),
+            tokens=prompt_tokens + max_tokens
+        )
+        return _completion(response)
+
+    if cache is None:
+        return (await call())[0]
+    return await cache.acomplete(template.fingerprint, params, messages, call)
+
+def _page_sections(pages_data):
+    return [(p['page'], p['page'], f"### TRANG {p['page']}: {p['content']}") for p in pages_data]
+
+def _partial_sections(windows, summaries):
+    return [
+        (w['first_page'], w['last_page'], f"### TRANG {w['first_page']} - {w['last_page']} (tóm tắt): {s}")
+        for w, s in zip(windows, summaries)
+    ]
+
+def summarize_document_content(pages_data, window_tokens, cache=None, concurrency=4):
+    """
+    Sử dụng GPT-4o để tóm tắt nội dung hồ sơ pháp lý.
+    Tài liệu dài hơn một cửa sổ (window_tokens token): tóm tắt từng cửa sổ trang song song (map)
+    rồi tóm tắt lại từ các bản tóm tắt phần (reduce), không cắt bỏ phần sau của tài liệu.
+    cache: ultis.llm_cache.LLMCache cho mọi lời gọi (cửa sổ lẫn bản tóm tắt cuối)
+    """
+    def summarize_window(window):
+        return _complete_summary(_build_window_summary_prompt(window), WINDOW_SUMMARY_MAX_TOKENS, cache)
+
+    try:
+        windows = _page_windows(_page_sections(pages_data), window_tokens)
+        partial = False
+        while len(windows) > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                summaries = list(pool.map(summarize_window, windows))
+            windows = _page_windows(_partial_sections(windows, summaries), window_tokens)
+            partial = True
+
+        request = _build_document_summary_prompt(windows[0]["text"] if windows else "", partial)
+        return _complete_summary(request, DOCUMENT_SUMMARY_PARAMS["max_tokens"], cache)
+
+    except Exception as e:
+        print(f"❌ OpenAI Summarization Error: {str(e)}")
+        return None
+
+async def asummarize_document_content(pages_data, async_client, window_tokens, cache=None, concurrency=4):
+    """
+    Bản asyncio của summarize_document_content (dùng AsyncOpenAI của pipeline xử lý nền).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize_window(window):
+        async with semaphore:
+            return await _acomplete_summary(async_client, _build_window_summary_prompt(window), WINDOW_SUMMARY_MAX_TOKENS, cache)
+
+    try:
+        windows = await asyncio.to_thread(_page_windows, _page_sections(pages_data), window_tokens)
+        partial = False
+        while len(windows) > 1:
+            summaries = await asyncio.gather(*(summarize_window(w) for w in windows))
+            windows = await asyncio.to_thread(_page_windows, _partial_sections(windows, summaries), window_tokens)
+            partial = True
+
+        request = _build_document_summary_prompt(windows[0]["text"] if windows else "", partial)
+        return await _acomplete_summary(async_client, request, DOCUMENT_SUMMARY_PARAMS["max_tokens"], cache)
 
     except Exception as e:
         print(f"❌ OpenAI Summarization Error: {str(e)}")
         return None
+
+CHAT_HISTORY_SUMMARY_PARAMS = {
+    "model": "gpt-4o-mini",
+    "temperature": 0,
+    "max_tokens": 500
+}
+
+def summarize_chat_history(previous_summary, turns):
+    """
+    Gộp các lượt hội thoại cũ vào bản tóm tắt lịch sử chat (rolling summary).
+    :param turns: list (role, content) theo thứ tự thời gian
+    """
+    transcript = "\n".join(f"{'Trợ lý' if role == 'bot' else 'Người dùng'}: {content}" for role, content in turns)
+    try:
+        _, prompt, prompt_tokens = _render('chat_history', previous_summary=previous_summary or "(chưa có)", transcript=transcript)
+        response = call_with_retry(
+            "openai", CHAT_HISTORY_SUMMARY_PARAMS["model"],
+            lambda: get_client().chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                **CHAT_HISTORY_SUMMARY_PARAMS
+            ),
+            tokens=prompt_tokens + CHAT_HISTORY_SUMMARY_PARAMS["max_tokens"]
+        )
+        return response.choices[0].message.content
+    except Exception as e:
+        print(f"❌ Chat History Summary Error: {e}")
+        return None
@@ -0,0 +1,81 @@
+import re
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+# [ref: ID], [Ref:ID], [ ref : ID1, ID2 ] ... (model không phải lúc nào cũng viết đúng khoảng trắng / hoa thường)
+REF_RE = re.compile(r"( ?)\[\s*ref\s*:\s*([0-9a-f\-]{32,36}(?:\s*[,;]\s*[0-9a-f\-]{32,36})*)\s*\]", re.IGNORECASE)
+ID_SPLIT_RE = re.compile(r"\s*[,;]\s*")
+# Ranh giới câu để lấy "câu khẳng định" đứng trước mã trích dẫn
+SENTENCE_END_RE = re.compile(r"[.!?\n]\s")
+WORD_RE = re.compile(r"\w+")
+
+@lru_cache(maxsize=4096)
+def _canonical(raw_id):
+    try:
+        return str(uuid.UUID(raw_id))
+    except ValueError:
+        return None
+
+def scan_refs(text):
+    """
+    Một lượt quét: trả về OrderedDict {document_id: câu chứa lần trích dẫn đầu tiên}
+    theo thứ tự xuất hiện (ID được chuẩn hóa dạng uuid thường, bỏ ID sai định dạng).
+    """
+    refs = OrderedDict()
+    claim_start = 0
+    for match in REF_RE.finditer(text):
+        head = text[claim_start:match.start()]
+        boundary = None
+        for boundary in SENTENCE_END_RE.finditer(head):
+            pass
+        claim = head[boundary.end():] if boundary else head
+        for raw_id in ID_SPLIT_RE.split(match.group(2)):
+            doc_id = _canonical(raw_id)
+            if doc_id and doc_id not in refs:
+                refs[doc_id] = claim.strip()
+        claim_start = match.end()
+    return refs
+
+def resolve_citations(text, index_map):
+    """
+    Thay mọi mã [ref: ID] bằng [n] trong một lượt re.sub.
+    index_map: {document_id: n}; ID không thuộc vụ án (model bịa / tài liệu đã xóa) bị bỏ khỏi text.
+    """
+    rendered = {}
+
+    def replace(match):
+        ids = match.group(2)
+        marker = rendered.get(ids)
+        if marker is None:
+            indexes = []
+            for raw_id in ID_SPLIT_RE.split(ids):
+                index = index_map.get(_canonical(raw_id))
+                if index is not None and index not in indexes:
+                    indexes.append(index)
+            marker = rendered[ids] = "".join(f"[{index}]" for index in indexes)
+        # Giữ khoảng trắng phía trước, trừ khi cả mã bị bỏ (tránh "... ." thừa khoảng trắng)
+        return match.group(1) + marker if marker else ""
+    return REF_RE.sub(replace, text)
+
+def _words(text):
+    return {w for w in WORD_RE.findall(text.casefold()) if len(w) > 1}
+
+def locate_claim(claim, pages, snippet_chars=300):
+    """
+    Tìm trang + đoạn trích trong tài liệu khớp nhất với câu khẳng định (độ trùng từ).
+    pages: [{"page": n, "content": ...}]. Trả về (page_number, snippet) hoặc (None, None).
+    """
+    claim_words = _words(claim)
+    if not claim_words:
+        return None, None
+    best = (0, None, None)
+    for page in pages or []:
+        for sentence in re.split(r"(?<=[.?!;])\s+|\n+", page.get("content") or ""):
+            overlap = len(claim_words & _words(sentence))
+            if overlap > best[0]:
+                best = (overlap, page["page"], sentence.strip())
+    if best[1] is None:
+        return None, None
+    snippet = best[2]
+    return best[1], snippet if len(snippet) <= snippet_chars else snippet[:snippet_chars] + "..."
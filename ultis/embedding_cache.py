@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+def normalize_text(text):
+    """Chuẩn hóa để các câu gần như giống nhau (khác hoa/thường, khoảng trắng) dùng chung một key"""
+    return " ".join(unicodedata.normalize("NFC", text).split()).casefold()
+
+def cache_key(text, model, normalize=False):
+    """
+    normalize=True: key theo text đã chuẩn hóa (câu hỏi chat gõ lại khác hoa/thường vẫn trúng cache).
+    Mặc định key theo đúng text (chunk tài liệu: hoa/thường có nghĩa, vd. tên riêng, viết tắt).
+    """
+    if normalize:
+        return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{model}\x00raw\x00{text}".encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """
+    Cache embedding 2 tầng, key = cache_key(text, model, normalize):
+    - Tầng 1: LRU trong process (max_entries, TTL)
+    - Tầng 2 (tùy chọn): SQLite cục bộ dùng chung giữa các process API / worker trên cùng máy (max_rows, TTL),
+      chỉ mở kết nối ở lần tra / ghi đầu tiên (import app không đụng tới file SQLite)
+    """
+    def __init__(self, max_entries=10000, ttl=30 * 24 * 3600, sqlite_path=None, max_rows=1000000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0}
+
+        self.sqlite_path = sqlite_path
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+
+    def _connection(self):
+        """Kết nối SQLite (gọi khi đang giữ _db_lock), mở + tạo bảng ở lần dùng đầu"""
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.sqlite_path)), exist_ok=True)
+            db = sqlite3.connect(self.sqlite_path, check_same_thread=False, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get_many(self, texts, model, normalize=False):
+        """Trả về list vector (None nếu miss) theo đúng thứ tự texts"""
+        now = time.time()
+        keys = [cache_key(t, model, normalize) for t in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._memory.get(key)
+                if entry and entry[0] > now:
+                    self._memory.move_to_end(key)
+                    results[i] = entry[1]
+                    self.stats["memory_hits"] += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing and self.sqlite_path:
+            for key, vector in self._db_get(list(missing), now).items():
+                self._remember(key, vector, now)
+                for i in missing.pop(key):
+                    results[i] = vector
+                    with self._lock:
+                        self.stats["shared_hits"] += 1
+
+        with self._lock:
+            self.stats["misses"] += sum(len(idx) for idx in missing.values())
+        return results
+
+    def set_many(self, texts, model, vectors, normalize=False):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            key = cache_key(text, model, normalize)
+            self._remember(key, vector, now)
+            rows.append((key, array('f', vector).tobytes(), now, now))
+        if rows and self.sqlite_path:
+            self._db_put(rows)
+
+    def _remember(self, key, vector, now):
+        with self._lock:
+            self._memory[key] = (now + self.ttl, vector)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _db_get(self, keys, now):
+        found = {}
+        with self._db_lock:
+            db = self._connection()
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders}) AND created_at > ?",
+                    [*batch, now - self.ttl]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array('f', blob).tolist()
+            if found:
+                db.executemany("UPDATE embeddings SET accessed_at = ? WHERE key = ?", [(now, k) for k in found])
+                db.commit()
+        return found
+
+    def _db_put(self, rows):
+        with self._db_lock:
+            db = self._connection()
+            db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._writes += len(rows)
+            # Định kỳ dọn entry hết hạn và cắt bớt theo LRU khi vượt max_rows
+            if self._writes >= 1000:
+                self._writes = 0
+                db.execute("DELETE FROM embeddings WHERE created_at <= ?", (time.time() - self.ttl,))
+                db.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,)
+                )
+            db.commit()
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.stats)
+            data["memory_entries"] = len(self._memory)
+        lookups = data["memory_hits"] + data["shared_hits"] + data["misses"]
+        data["hit_rate"] = round((data["memory_hits"] + data["shared_hits"]) / lookups, 4) if lookups else 0.0
+        return data
+
+def _split_misses(cache, texts, model, normalize):
+    vectors = cache.get_many(texts, model, normalize) if cache else [None] * len(texts)
+    # Text trùng nhau (cùng key) trong cùng lô chỉ embed một lần
+    pending = OrderedDict()
+    for i, (text, vector) in enumerate(zip(texts, vectors)):
+        if vector is None:
+            pending.setdefault(normalize_text(text) if normalize else text, (text, []))[1].append(i)
+    return vectors, list(pending.values())
+
+def embed_with_cache(texts, model, embed_fn, cache, normalize=False):
+    """
+    embed_fn(list[str]) -> list[vector]; chỉ gọi cho các text chưa có trong cache.
+    normalize: xem cache_key (chỉ dùng cho câu hỏi chat, không dùng cho chunk tài liệu)
+    """
+    vectors, pending = _split_misses(cache, texts, model, normalize)
+    if pending:
+        to_embed = [text for text, _ in pending]
+        new_vectors = embed_fn(to_embed)
+        for (_, positions), vector in zip(pending, new_vectors):
+            for i in positions:
+                vectors[i] = vector
+        if cache:
+            cache.set_many(to_embed, model, new_vectors, normalize)
+    return vectors
+
+async def aembed_with_cache(texts, model, aembed_fn, cache, normalize=False):
+    """Bản asyncio: aembed_fn(list[str]) là coroutine; truy cập SQLite chạy trong thread"""
+    vectors, pending = await asyncio.to_thread(_split_misses, cache, texts, model, normalize)
+    if pending:
+        to_embed = [text for text, _ in pending]
+        new_vectors = await aembed_fn(to_embed)
+        for (_, positions), vector in zip(pending, new_vectors):
+            for i in positions:
+                vectors[i] = vector
+        if cache:
+            await asyncio.to_thread(cache.set_many, to_embed, model, new_vectors, normalize)
+    return vectors
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import json
+import threading
+
+class LLMCache:
+    """
+    Cache kết quả gọi LLM (chat completion) cho các prompt tất định, ví dụ tóm tắt tài liệu / master summary.
+    Key = fingerprint prompt template + model + temperature + hash(messages + tham số gọi),
+    nên sửa prompt, đổi model hay đổi đầu vào đều tự ra key mới.
+    - backend: kho key -> JSON có eviction, ví dụ ultis.disk_cache.DiskCache (dùng chung giữa các process)
+    - max_temperature: chỉ cache lời gọi có temperature <= ngưỡng (temperature cao => mỗi lần một kết quả)
+    - bypass: bỏ qua bước đọc (luôn gọi model) nhưng vẫn ghi đè kết quả mới, dùng khi cần làm mới toàn bộ
+    Chỉ lưu kết quả dùng được: không rỗng, không bị cắt vì hết max_tokens (finish_reason == "length")
+    và qua được validate(content) nếu có, để một lần model trả lỗi không bị phát lại mãi từ cache.
+    """
+    def __init__(self, backend, max_temperature=0.0, bypass=False):
+        self.backend = backend
+        self.max_temperature = max_temperature
+        self.bypass = bypass
+        self.bypassed = 0
+        self.uncacheable = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(fingerprint, params, messages):
+        payload = json.dumps({"params": params, "messages": messages}, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return f"llm:{fingerprint}:{params.get('model')}:t{params.get('temperature', 1)}:{digest}"
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _lookup_key(self, fingerprint, params, messages):
+        """Key để tra / ghi, hoặc None nếu lời gọi không được cache"""
+        if params.get("temperature", 1) > self.max_temperature:
+            self._count("uncacheable")
+            return None
+        return self.key(fingerprint, params, messages)
+
+    def _get(self, key):
+        if self.bypass:
+            self._count("bypassed")
+            return None
+        return self.backend.get(key)
+
+    def _storable(self, content, finish_reason, validate):
+        if not content:
+            return False
+        if finish_reason == "length" or (validate is not None and not validate(content)):
+            self._count("rejected")
+            return False
+        return True
+
+    def complete(self, fingerprint, params, messages, call, validate=None):
+        """
+        Trả về nội dung đã cache hoặc gọi call() -> (content, finish_reason).
+        Lỗi không được cache; kết quả rỗng / bị cắt / không qua validate(content) thì trả về nhưng không lưu.
+        """
+        key = self._lookup_key(fingerprint, params, messages)
+        if key is None:
+            return call()[0]
+        result = self._get(key)
+        if result is None:
+            result, finish_reason = call()
+            if self._storable(result, finish_reason, validate):
+                self.backend.set(key, result)
+        return result
+
+    async def acomplete(self, fingerprint, params, messages, call, validate=None):
+        """Bản asyncio của complete: call là coroutine function, đọc / ghi đĩa chạy trong thread"""
+        key = self._lookup_key(fingerprint, params, messages)
+        if key is None:
+            return (await call())[0]
+        result = await asyncio.to_thread(self._get, key)
+        if result is None:
+            result, finish_reason = await call()
+            if self._storable(result, finish_reason, validate):
+                await asyncio.to_thread(self.backend.set, key, result)
+        return result
+
+    def stats(self):
+        stats = dict(self.backend.stats())
+        with self._lock:
+            stats.update(bypassed=self.bypassed, uncacheable=self.uncacheable, rejected=self.rejected)
+        return stats
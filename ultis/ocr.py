@@ -1,16 +1,45 @@
 import base64
+import hashlib
 import os
 import io
-import requests
 import time
-from docx import Document as DocxDocument
-from mistralai import Mistral
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ultis.rate_limit import backoff_delay, call_with_retry
+
+# mistralai / python-docx / pypdf được import ở lần dùng đầu (process API chỉ import module này, không OCR)
+
+# Đổi version khi thay logic đọc DOCX/TXT để cache cũ tự mất hiệu lực
+NATIVE_EXTRACTOR_VERSION = "native-v1"
+# Định dạng OCR qua Mistral (file nặng / ảnh) và định dạng đọc trực tiếp (file văn bản)
+OCR_EXTENSIONS = ('pdf', 'jpg', 'jpeg', 'png', 'webp')
+NATIVE_EXTENSIONS = ('docx', 'txt', 'md')
 
 class ContentExtractionService:
-    def __init__(self):
-        # Khởi tạo client một lần duy nhất để tối ưu hiệu năng
-        self.mistral_client = Mistral(api_key=os.environ.get("MISTRAL_API_KEY"))
+    def __init__(self, cache=None, upload_mode="file", split_threshold_pages=50, page_batch_size=25, batch_concurrency=4,
+                 client_provider=None):
+        # Client Mistral tạo lười ở lần OCR đầu tiên: client_provider (vd. app.extensions.get_mistral_client,
+        # dùng chung pool kết nối) hoặc tự tạo một client từ MISTRAL_API_KEY
+        self._client_provider = client_provider
+        self._mistral_client = None
         self.ocr_model = "mistral-ocr-latest"
+        # Cache kết quả bóc tách theo (hash nội dung file, model), ví dụ ultis.disk_cache.DiskCache
+        self.cache = cache
+        # "file": stream file lên Mistral Files API rồi OCR qua signed URL (RAM không phụ thuộc kích thước file)
+        # "base64": nhúng cả file vào data URI (cách cũ, tốn RAM ~2-3x kích thước file)
+        self.upload_mode = upload_mode
+        # PDF dài hơn split_threshold_pages trang được OCR theo từng lô page_batch_size trang song song
+        self.split_threshold_pages = split_threshold_pages
+        self.page_batch_size = page_batch_size
+        self.batch_concurrency = batch_concurrency
+
+    @property
+    def mistral_client(self):
+        if self._client_provider is not None:
+            return self._client_provider()
+        if self._mistral_client is None:
+            from mistralai import Mistral
+            self._mistral_client = Mistral(api_key=os.environ.get("MISTRAL_API_KEY"))
+        return self._mistral_client
 
     def _encode_to_base64(self, file_path):
         """Helper: Chuyển file sang Data URI Base64"""
@@ -21,32 +50,116 @@ class ContentExtractionService:
         mime_type = "application/pdf" if ext == 'pdf' else f"image/{ext}"
         return f"data:{mime_type};base64,{encoded_string}"
 
+    def _upload_for_ocr(self, file_path):
+        """Helper: Stream file từ ổ cứng lên Mistral (không đọc cả file vào RAM), trả về (file_id, signed_url)"""
+        def upload():
+            with open(file_path, "rb") as f:
+                return self.mistral_client.files.upload(
+                    file={"file_name": os.path.basename(file_path), "content": f},
+                    purpose="ocr"
+                )
+        uploaded = call_with_retry("mistral", "files", upload)
+        signed = call_with_retry(
+            "mistral", "files", lambda: self.mistral_client.files.get_signed_url(file_id=uploaded.id)
+        )
+        return uploaded.id, signed.url
+
+    def _delete_uploaded(self, file_id):
+        try:
+            self.mistral_client.files.delete(file_id=file_id)
+        except Exception as e:
+            print(f"⚠️ Mistral file cleanup error [{file_id}]: {e}")
+
+    def _build_ocr_document(self, file_path, source_url):
+        ext = file_path.split('.')[-1].lower()
+        if ext == 'pdf':
+            return {"type": "document_url", "document_url": source_url}
+        return {"type": "image_url", "image_url": source_url}
+
+    def _count_pdf_pages(self, file_path):
+        if not file_path.lower().endswith('.pdf'):
+            return None
+        try:
+            from pypdf import PdfReader
+        except ImportError:  # pypdf không bắt buộc: thiếu thì OCR cả file trong một request như cũ
+            return None
+        try:
+            return len(PdfReader(file_path).pages)
+        except Exception as e:
+            print(f"⚠️ Cannot read PDF page count [{os.path.basename(file_path)}]: {e}")
+            return None
+
+    def _ocr_request(self, document, pages=None, retries=2):
+        """Một request OCR (toàn bộ file hoặc một lô trang, index 0-based) qua rate limiter dùng chung"""
+        extra = {} if pages is None else {"pages": pages}
+        ocr_response = call_with_retry(
+            "mistral", self.ocr_model,
+            lambda: self.mistral_client.ocr.process(model=self.ocr_model, document=document, **extra),
+            max_retries=retries
+        )
+        # index là số thứ tự trang trong file gốc => số trang luôn đúng kể cả khi OCR theo lô
+        return [{"page": p.index + 1, "content": p.markdown} for p in ocr_response.pages]
+
+    def _ocr_in_batches(self, document, page_count, retries=2):
+        """OCR song song theo lô trang; lỗi ở lô nào thì chỉ chạy lại lô đó rồi ghép kết quả theo thứ tự"""
+        batches = [
+            list(range(start, min(start + self.page_batch_size, page_count)))
+            for start in range(0, page_count, self.page_batch_size)
+        ]
+        results = {}
+        pending = list(range(len(batches)))
+
+        for attempt in range(retries + 1):
+            failed, last_error = [], None
+            with ThreadPoolExecutor(max_workers=max(1, min(self.batch_concurrency, len(pending)))) as pool:
+                futures = {pool.submit(self._ocr_request, document, batches[i], 0): i for i in pending}
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    try:
+                        results[idx] = future.result()
+                    except Exception as e:
+                        failed.append(idx)
+                        last_error = e
+
+            if not failed:
+                break
+            if attempt < retries:
+                print(f"⚠️ OCR retry {len(failed)}/{len(batches)} page batches")
+                time.sleep(backoff_delay(attempt))
+            pending = sorted(failed)
+        else:
+            raise RuntimeError(f"{len(pending)}/{len(batches)} page batches failed: {last_error}")
+
+        return [page for i in range(len(batches)) for page in results[i]]
+
     def process_mistral_ocr(self, file_path, retries=2):
         """Xử lý OCR qua Mistral với cơ chế thử lại (Retry)"""
+        file_id = None
         try:
-            data_uri = self._encode_to_base64(file_path)
-            
-            for attempt in range(retries + 1):
-                try:
-                    ocr_response = self.mistral_client.ocr.process(
-                        model=self.ocr_model,
-                        document={"type": "document_url", "document_url": data_uri}
-                    )
-                    return [{"page": i + 1, "content": p.markdown} for i, p in enumerate(ocr_response.pages)]
-                except Exception as e:
-                    if attempt < retries:
-                        time.sleep(2) # Nghỉ 2s trước khi thử lại (Xử lý Rate Limit tạm thời)
-                        continue
-                    raise e
+            # Payload chỉ chuẩn bị MỘT lần, các lần retry / các lô trang dùng lại cùng tham chiếu
+            if self.upload_mode == "file":
+                file_id, source_url = self._upload_for_ocr(file_path)
+            else:
+                source_url = self._encode_to_base64(file_path)
+            document = self._build_ocr_document(file_path, source_url)
+
+            page_count = self._count_pdf_pages(file_path)
+            if page_count and page_count > self.split_threshold_pages:
+                return self._ocr_in_batches(document, page_count, retries)
+            return self._ocr_request(document, retries=retries)
         except Exception as e:
             print(f"❌ Mistral OCR Error [{os.path.basename(file_path)}]: {e}")
             return None
+        finally:
+            if file_id:
+                self._delete_uploaded(file_id)
 
     def process_native_text(self, file_path):
         """Xử lý đọc file text/docx trực tiếp từ ổ cứng (không dùng requests)"""
         try:
             ext = file_path.split('.')[-1].lower()
             if ext == 'docx':
+                from docx import Document as DocxDocument
                 doc = DocxDocument(file_path)
                 text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
             else:
@@ -57,7 +170,20 @@ class ContentExtractionService:
             print(f"❌ Native Text Error [{os.path.basename(file_path)}]: {e}")
             return None
 
-    def extract_content(self, file_path):
+    @staticmethod
+    def hash_file(file_path, chunk_size=1024 * 1024):
+        """SHA-256 nội dung file, đọc theo chunk"""
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def supports(self, file_path):
+        """File tồn tại và có định dạng bóc tách được (False => lỗi vĩnh viễn, xử lý lại cũng vô ích)"""
+        return os.path.exists(file_path) and file_path.split('.')[-1].lower() in OCR_EXTENSIONS + NATIVE_EXTENSIONS
+
+    def extract_content(self, file_path, content_hash=None):
         """Router chính: Nhận đường dẫn file cục bộ và điều hướng xử lý"""
         if not os.path.exists(file_path):
             return None
@@ -65,11 +191,25 @@ class ContentExtractionService:
         ext = file_path.split('.')[-1].lower()
         
         # Nhóm xử lý OCR (File nặng/Ảnh)
-        if ext in ['pdf', 'jpg', 'jpeg', 'png', 'webp']:
-            return self.process_mistral_ocr(file_path)
+        if ext in OCR_EXTENSIONS:
+            extract, extractor_name = self.process_mistral_ocr, self.ocr_model
         
         # Nhóm xử lý Native (File văn bản)
-        elif ext in ['docx', 'txt', 'md']:
-            return self.process_native_text(file_path)
-            
-        return None
\ No newline at end of file
+        elif ext in NATIVE_EXTENSIONS:
+            extract, extractor_name = self.process_native_text, NATIVE_EXTRACTOR_VERSION
+        else:
+            return None
+
+        if self.cache is None:
+            return extract(file_path)
+
+        # Cache theo nội dung file + model: cùng một tài liệu upload lại ở vụ án khác không phải OCR lại
+        cache_key = f"{extractor_name}:{content_hash or self.hash_file(file_path)}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        content_pages = extract(file_path)
+        if content_pages:
+            self.cache.set(cache_key, content_pages)
+        return content_pages
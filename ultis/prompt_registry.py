@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import string
+import threading
+import time
+from functools import cached_property
+from ultis.tokens import count_tokens
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompt')
+# Kiểm tra mtime file prompt tối đa mỗi N giây (0 = mỗi lần gọi, âm = tắt hot reload)
+PROMPT_RELOAD_INTERVAL = float(os.environ.get("PROMPT_RELOAD_INTERVAL", 2))
+PROMPT_FILES = ('instruction.txt', 'example.json', 'template.txt')
+
+class PromptTemplate:
+    """
+    Một thư mục prompt đã đọc + kiểm tra (bất biến, tạo lại khi file đổi):
+    - system: instruction (+ "Mẫu kết quả" từ example.json nếu có), ghép sẵn một lần
+    - template.txt: user prompt có placeholder {ten_bien}, đã parse sẵn danh sách biến
+    - fingerprint: hash nội dung các file, dùng làm khóa cache / version của prompt
+    - system_tokens / template_tokens: số token phần tĩnh, tính một lần (lần dùng đầu, để khởi động
+      không phải nạp tokenizer) rồi dùng lại để ước lượng ngân sách mỗi lần gọi
+    """
+    def __init__(self, name, files, model="gpt-4o-mini"):
+        self.name = name
+        instruction = files.get('instruction.txt', '').strip()
+        example = files.get('example.json')
+        template = files.get('template.txt')
+        if not instruction and template is None:
+            raise ValueError(f"Prompt '{name}': cần instruction.txt hoặc template.txt")
+        if example is not None:
+            try:
+                json.loads(example)
+            except ValueError as e:
+                raise ValueError(f"Prompt '{name}': example.json không hợp lệ ({e})")
+            self.system = f"{instruction}\n\n Mẫu kết quả:\n{example}"
+        else:
+            self.system = instruction
+
+        self.template = template
+        self.fields = ()
+        if template is not None:
+            try:
+                self.fields = tuple(dict.fromkeys(
+                    field for _, field, _, _ in string.Formatter().parse(template) if field is not None
+                ))
+            except ValueError as e:
+                raise ValueError(f"Prompt '{name}': template.txt sai cú pháp placeholder ({e})")
+            for field in self.fields:
+                if not field.isidentifier():
+                    raise ValueError(f"Prompt '{name}': placeholder không hợp lệ {{{field}}}")
+
+        digest = hashlib.sha256()
+        for file_name in sorted(files):
+            digest.update(file_name.encode('utf-8') + b'\0' + files[file_name].encode('utf-8') + b'\0')
+        self.fingerprint = f"{name}:{digest.hexdigest()[:16]}"
+        self.model = model
+
+    @cached_property
+    def system_tokens(self):
+        return count_tokens(self.system, self.model)
+
+    @cached_property
+    def template_tokens(self):
+        return count_tokens(self.render(**{field: "" for field in self.fields}), self.model) if self.template else 0
+
+    @property
+    def static_tokens(self):
+        return self.system_tokens + self.template_tokens
+
+    def render(self, **values):
+        """Điền biến vào template.txt (thiếu biến => KeyError, không gửi prompt hỏng)"""
+        if self.template is None:
+            raise ValueError(f"Prompt '{self.name}' không có template.txt")
+        return self.template.format(**values)
+
+class PromptRegistry:
+    """
+    Nạp toàn bộ prompt trong ultis/prompt/ một lần (load_all khi khởi động, lỗi thì dừng app),
+    sau đó get() trả về bản trong bộ nhớ và tự nạp lại khi file thay đổi (so mtime).
+    Bản sửa lỗi không qua kiểm tra thì giữ bản cũ và cảnh báo, không làm hỏng request đang chạy.
+    """
+    def __init__(self, directory=PROMPT_DIR, reload_interval=PROMPT_RELOAD_INTERVAL):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._templates = {}
+        self._mtimes = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+    def _stat(self, name):
+        mtimes = {}
+        for file_name in PROMPT_FILES:
+            try:
+                mtimes[file_name] = os.stat(os.path.join(self.directory, name, file_name)).st_mtime_ns
+            except FileNotFoundError:
+                pass
+        return mtimes
+
+    def _load(self, name, mtimes):
+        files = {}
+        for file_name in mtimes:
+            with open(os.path.join(self.directory, name, file_name), 'r', encoding='utf-8') as f:
+                files[file_name] = f.read()
+        template = PromptTemplate(name, files)
+        self._templates[name] = template
+        self._mtimes[name] = mtimes
+        return template
+
+    def load_all(self):
+        """Nạp + kiểm tra mọi thư mục prompt; raise ValueError nếu có prompt lỗi"""
+        with self._lock:
+            for name in sorted(os.listdir(self.directory)):
+                if os.path.isdir(os.path.join(self.directory, name)):
+                    self._load(name, self._stat(name))
+                    self._checked_at[name] = time.monotonic()
+        print(f"📝 Loaded {len(self._templates)} prompt templates")
+        return dict(self._templates)
+
+    def get(self, name):
+        now = time.monotonic()
+        template = self._templates.get(name)
+        if template is not None and (
+            self.reload_interval < 0 or now - self._checked_at.get(name, 0) < self.reload_interval
+        ):
+            return template
+
+        with self._lock:
+            self._checked_at[name] = now
+            mtimes = self._stat(name)
+            template = self._templates.get(name)
+            if template is not None and mtimes == self._mtimes.get(name):
+                return template
+            if not mtimes:
+                if template is None:
+                    raise KeyError(f"Không tìm thấy prompt '{name}' trong {self.directory}")
+                print(f"⚠️ Prompt '{name}' đã bị xóa khỏi đĩa, dùng bản đang nạp")
+                return template
+            try:
+                reloaded = self._load(name, mtimes)
+            except (OSError, ValueError) as e:
+                if template is None:
+                    raise
+                print(f"⚠️ Prompt '{name}' lỗi sau khi sửa, giữ bản cũ: {e}")
+                self._mtimes[name] = mtimes
+                return template
+            if template is not None:
+                print(f"🔄 Reloaded prompt '{name}' ({reloaded.fingerprint})")
+            return reloaded
+
+prompts = PromptRegistry()
@@ -0,0 +1,238 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+# Mã HTTP đáng thử lại: quá tải / rate limit / lỗi tạm thời phía provider
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", 1))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", 60))
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", 5))
+
+# Ngân sách mặc định theo provider; ghi đè bằng env RATE_LIMIT_<PROVIDER>[_<MODEL>]_RPM / _TPM
+DEFAULT_BUDGETS = {
+    "openai": {"rpm": 500, "tpm": 200000},
+    "mistral": {"rpm": 60, "tpm": 0},
+}
+
+
+class TokenBucket:
+    """
+    Token bucket kiểu "đặt chỗ": reserve() trừ token ngay (cho phép âm) và trả về số giây
+    phải chờ. Không tự sleep nên dùng được cho cả thread lẫn asyncio, và giữ thứ tự FIFO.
+    """
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.base_rate = per_minute / 60.0
+        self.rate = self.base_rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        self._refill(now)
+        # Yêu cầu lớn hơn cả dung lượng bucket thì chỉ chờ tới khi bucket đầy
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Giới hạn requests/phút và tokens/phút cho một cặp (provider, model), tự giảm tốc khi gặp 429"""
+    MIN_RATE_FACTOR = 0.1
+
+    def __init__(self, name, rpm, tpm):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.rate_factor = 1.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.metrics = {
+            "requests": 0, "waited": 0, "wait_total_s": 0.0, "wait_max_s": 0.0,
+            "rate_limited": 0, "retries": 0, "errors": 0
+        }
+
+    def reserve(self, tokens=0):
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._paused_until - now)
+            if self.requests:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens and tokens:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            self.metrics["requests"] += 1
+            if delay > 0:
+                self.metrics["waited"] += 1
+                self.metrics["wait_total_s"] += delay
+                self.metrics["wait_max_s"] = max(self.metrics["wait_max_s"], delay)
+            return delay
+
+    def acquire(self, tokens=0):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=0):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _apply_rate_factor(self):
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.rate = bucket.base_rate * self.rate_factor
+
+    def on_rate_limited(self, retry_after=None):
+        """429: tạm dừng mọi request của limiter và giảm một nửa tốc độ (AIMD)"""
+        with self._lock:
+            self.metrics["rate_limited"] += 1
+            self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor / 2)
+            self._apply_rate_factor()
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def on_success(self):
+        """Hồi phục tốc độ dần dần sau khi hết bị 429"""
+        if self.rate_factor >= 1.0:
+            return
+        with self._lock:
+            self.rate_factor = min(1.0, self.rate_factor + 0.05)
+            self._apply_rate_factor()
+
+    def record(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.metrics)
+            data["wait_avg_s"] = round(data["wait_total_s"] / data["requests"], 4) if data["requests"] else 0.0
+            data["wait_total_s"] = round(data["wait_total_s"], 4)
+            data["wait_max_s"] = round(data["wait_max_s"], 4)
+            data["rate_factor"] = round(self.rate_factor, 3)
+            return data
+
+
+_limiters = {}
+_registry_lock = threading.Lock()
+
+
+def _budget(provider, model, kind):
+    model_key = "".join(c if c.isalnum() else "_" for c in model).upper()
+    for env_key in (f"RATE_LIMIT_{provider.upper()}_{model_key}_{kind.upper()}",
+                    f"RATE_LIMIT_{provider.upper()}_{kind.upper()}"):
+        if os.environ.get(env_key):
+            return int(os.environ[env_key])
+    return DEFAULT_BUDGETS.get(provider, {}).get(kind, 0)
+
+
+def get_limiter(provider, model):
+    key = f"{provider}:{model}"
+    with _registry_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(key, _budget(provider, model, "rpm"), _budget(provider, model, "tpm"))
+        return _limiters[key]
+
+
+def rate_limit_metrics():
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
+
+
+def estimate_tokens(*texts, completion=0):
+    """Ước lượng nhanh số token (~4 ký tự/token) để trừ ngân sách TPM"""
+    return sum(len(t) for t in texts if t) // 4 + completion
+
+
+def _status_code(error):
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error):
+    # Import lúc có lỗi: SDK đã được nạp bởi lời gọi vừa lỗi, không kéo openai vào mọi process khi khởi động
+    import httpx
+    import openai
+    if isinstance(error, (httpx.TransportError, openai.APIConnectionError, TimeoutError, ConnectionError)):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS
+
+
+def retry_after_seconds(error):
+    """Đọc header Retry-After / retry-after-ms từ response lỗi (OpenAI: .response, Mistral: .raw_response)"""
+    response = getattr(error, "response", None) or getattr(error, "raw_response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """Exponential backoff + full jitter"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def _on_error(limiter, error, attempt, max_retries):
+    """Phản hồi lỗi cho limiter; trả về số giây chờ trước lần thử lại, hoặc None nếu không thử lại nữa"""
+    retry_after = retry_after_seconds(error)
+    if _status_code(error) == 429:
+        limiter.on_rate_limited(retry_after)
+    if attempt >= max_retries or not is_retryable(error):
+        limiter.record("errors")
+        return None
+    limiter.record("retries")
+    return retry_after if retry_after is not None else backoff_delay(attempt)
+
+
+def call_with_retry(provider, model, fn, tokens=0, max_retries=None):
+    """Gọi fn() qua rate limiter của (provider, model), thử lại lỗi tạm thời với backoff có jitter"""
+    limiter = get_limiter(provider, model)
+    max_retries = RETRY_MAX_ATTEMPTS if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        limiter.acquire(tokens)
+        try:
+            result = fn()
+        except Exception as e:
+            delay = _on_error(limiter, e, attempt, max_retries)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        limiter.on_success()
+        return result
+
+
+async def acall_with_retry(provider, model, afn, tokens=0, max_retries=None):
+    """Bản asyncio của call_with_retry: afn() trả về coroutine"""
+    limiter = get_limiter(provider, model)
+    max_retries = RETRY_MAX_ATTEMPTS if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        await limiter.acquire_async(tokens)
+        try:
+            result = await afn()
+        except Exception as e:
+            delay = _on_error(limiter, e, attempt, max_retries)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        limiter.on_success()
+        return result
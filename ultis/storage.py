@@ -1,15 +1,57 @@
+import hashlib
 import os
+import tempfile
 from werkzeug.utils import secure_filename
 from flask import current_app
 
 class StorageService:
     @staticmethod
-    def save_file(case_id, file):
-        filename = secure_filename(file.filename)
-        # Format: case_id/filename để dễ quản lý
-        relative_path = os.path.join(str(case_id), filename)
-        full_path = os.path.join(current_app.config['UPLOAD_FOLDER'], relative_path)
-        
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        file.save(full_path)
-        return relative_path # Lưu path tương đối vào DB
\ No newline at end of file
+    def save_file(file):
+        """
+        Lưu file upload theo kiểu streaming: đọc từng chunk cố định, ghi ra file tạm
+        và tính SHA-256 trong cùng một lượt, sau đó rename atomic vào đường dẫn
+        theo nội dung (content-addressed). File trùng nội dung chỉ được giữ một bản.
+        :return: (relative_path, sha256_hex, size_bytes)
+        """
+        upload_base = current_app.config['UPLOAD_FOLDER']
+        chunk_size = current_app.config['UPLOAD_CHUNK_SIZE']
+        ext = os.path.splitext(secure_filename(file.filename) or '')[1].lower()
+
+        # File tạm nằm cùng filesystem với thư mục đích để os.replace là atomic
+        tmp_dir = os.path.join(upload_base, '.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = file.stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            content_hash = hasher.hexdigest()
+            relative_path = StorageService.blob_path(content_hash, ext)
+            full_path = os.path.join(upload_base, relative_path)
+
+            if os.path.exists(full_path):
+                # Đã có file cùng nội dung: bỏ bản tạm, không ghi lại lần nữa
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return relative_path, content_hash, size # Lưu path tương đối vào DB
+
+    @staticmethod
+    def blob_path(content_hash, ext=''):
+        """Format: blobs/ab/abcdef...<ext> (chia thư mục theo 2 ký tự đầu của hash)"""
+        return os.path.join('blobs', content_hash[:2], f"{content_hash}{ext}")
@@ -0,0 +1,34 @@
+import threading
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken là tùy chọn: thiếu thì ước lượng ~4 ký tự/token
+    tiktoken = None
+
+_encodings = {}
+_lock = threading.Lock()
+
+def _encoding(model):
+    """Encoding tiktoken của model (cache theo model); None nếu không tải được (offline, thiếu thư viện)"""
+    with _lock:
+        if model not in _encodings:
+            encoding = None
+            if tiktoken is not None:
+                try:
+                    try:
+                        encoding = tiktoken.encoding_for_model(model)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    print(f"⚠️ tiktoken không khả dụng cho {model}, dùng ước lượng: {e}")
+            _encodings[model] = encoding
+        return _encodings[model]
+
+def count_tokens(text, model="gpt-4o"):
+    """Đếm token cục bộ (không gọi API) theo tokenizer của model"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,10 @@
+from app import create_app
+from app.services.job_worker import JobWorker
+# Worker xử lý nền (OCR, tóm tắt...) chạy tách khỏi API.
+# Scale bằng cách chạy thêm process: python worker.py
+app = create_app()
+
+if __name__ == "__main__":
+    worker = JobWorker(app)
+    worker.install_signal_handlers()
+    worker.run()